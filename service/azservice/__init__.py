@@ -3,3 +3,9 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 __version__ = '0.1.0'
+
+import re
+
+
+def version_tuple(version):
+    return tuple(int(part) for part in re.findall(r'\d+', version)[0:3])
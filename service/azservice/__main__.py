@@ -5,8 +5,9 @@
 # --------------------------------------------------------------------------------------------
 from __future__ import print_function
 
-from sys import stdin, stdout, stderr
+from sys import stdin, stdout, stderr, argv
 import json
+import os
 import time
 from threading  import Thread
 try:
@@ -14,12 +15,47 @@ try:
 except ImportError:
     from queue import Queue, Empty # python 3.x
 
-from azservice.tooling import GLOBAL_ARGUMENTS, initialize, load_command_table, get_help, get_current_subscription, get_configured_defaults, get_defaults, is_required, run_argument_value_completer, get_arguments, load_arguments, arguments_loaded
+PROCESS_START = time.time()
+IMPORT_PROFILER = None
+if '--profile-imports' in argv: # Reports the import time tree on stderr after the first response.
+    from azservice.profiling import ImportProfiler
+    IMPORT_PROFILER = ImportProfiler()
+    IMPORT_PROFILER.install()
+
+if '--supervise' in argv: # Runs the service in a worker process, keeping a warm standby to take over when it exits.
+    from azservice.supervisor import supervise
+    raise SystemExit(supervise(argv))
+
+from azservice.memory import BUDGET, estimate_size # noqa: E402
+from azservice.prefetch import Prefetcher # noqa: E402
+from azservice.coalescing import get_request_key, take_duplicates # noqa: E402
+from azservice.ranking import get_value_completions # noqa: E402
+from azservice.progressive import is_progressive, take_ready_snippets, get_streams, send_chunks # noqa: E402
+from azservice.usage import UsageIndex, get_example_options # noqa: E402
+from azservice.index import get_group_index, add_to_group_index, remove_from_group_index, get_snippets, add_snippets, remove_snippets # noqa: E402
+from azservice.tooling import GLOBAL_ARGUMENTS, initialize, load_command_table, get_help, get_current_subscription, get_configured_defaults, get_defaults, is_required, run_argument_value_completer, get_arguments, load_arguments, arguments_loaded, get_loaded_commands, get_installed_extensions, load_extension, unload_extension, get_options, get_config_mtime, prepare_argument_value_completer, get_completer_name, save_state, load_state, get_examples # noqa: E402
 
-NO_AZ_PREFIX_COMPLETION_ENABLED = True # Adds proposals without 'az' as prefix to trigger, 'az' is then inserted as part of the completion.
 AUTOMATIC_SNIPPETS_ENABLED = True # Adds snippet proposals derived from the command table
-TWO_SEGMENTS_COMPLETION_ENABLED = False # Adds 'webapp create', 'appservice plan', etc. as proposals.
 REQUIRED_ARGUMENTS_IN_COMMAND_COMPLETIONS = False # Adds required arguments to command completions (always for snippets)
+EXTENSIONS_WATCH_INTERVAL = 2 # Seconds between checks of the extensions directory for added, updated or removed extensions.
+LAZY_COMMAND_LOADING_ENABLED = False # Imports command modules on first use, using a manifest of command names written by a previous full load.
+PROGRESSIVE_CHUNK_INTERVAL = 0.5 # Seconds between follow-up chunks of progressive completions while arguments are loading.
+MEMORY_BUDGET_MB = os.environ.get('AZ_SERVICE_MEMORY_BUDGET_MB') # Evicts help, arguments and prefetched values of least recently used commands beyond this budget (unbounded if not set).
+PREFETCH_ENABLED = True # Runs the value completers of required and defaulted arguments in the background after argument name completions.
+PREFETCH_EXCLUDED_COMPLETERS = ['FilesCompleter', 'DirectoriesCompleter', 'get_urn_aliases_completion_list'] # Completers never run speculatively.
+WARM_STATE_ENABLED = True # Saves the index, help, snippet templates and prefetched values for the next service process to start with.
+STATE_SAVE_INTERVAL = 30 # Minimum seconds between saves of the warm state, only saved when it changed.
+REQUEST_COALESCING_ENABLED = True # Answers identical requests queued or arriving while one is computed with a single result.
+USAGE_RANKING_ENABLED = True # Ranks argument name completions by their use in help examples, together with the arguments already given.
+USAGE_INDEX_SLICE = 0.03 # Seconds of help example indexing between checks for requests.
+
+EXTENSIONS_CHANGED = 'extensions_changed'
+
+SNIPPET_TEMPLATES = {} # Required argument placeholders by command name, computed with CONFIGURED_DEFAULTS.
+CONFIGURED_DEFAULTS = { 'mtime': None, 'defaults': None }
+PREFETCHER = Prefetcher(excluded=PREFETCH_EXCLUDED_COMPLETERS, budget=BUDGET)
+USAGE_INDEX = UsageIndex()
+REQUEST_STATS = { 'requests': 0, 'computed': 0, 'coalesced': 0 }
 
 AZ_COMPLETION = {
     'name': 'az',
@@ -27,100 +63,51 @@ AZ_COMPLETION = {
     'documentation': 'Microsoft command-line tools for Azure.'
 }
 
-def get_group_index(command_table):
-    index = { '': [], '-': [] }
-    for command in command_table.values():
-        parts = command.name.split()
-        len_parts = len(parts)
-        for i in range(1, len_parts):
-            group = ' '.join(parts[0:i])
-            if group not in index:
-                index[group] = []
-                parent = ' '.join(parts[0:i - 1])
-                completion = {
-                    'name': parts[i - 1],
-                    'kind': 'group',
-                    'detail': group
-                }
-                help = get_help(group)
-                if help:
-                    description = help.get('short-summary')
-                    if description:
-                        completion['documentation'] = description
-
-                index[parent].append(completion)
-                if NO_AZ_PREFIX_COMPLETION_ENABLED and i == 1:
-                    add = completion.copy()
-                    add['snippet'] = 'az ' + add['name']
-                    index['-'].append(add)
-                
-                if TWO_SEGMENTS_COMPLETION_ENABLED and i > 1:
-                    add = completion.copy()
-                    add['name'] = ' '.join(parts[i - 2:i])
-                    index[' '.join(parts[0:i - 2])].append(add)
-                    if NO_AZ_PREFIX_COMPLETION_ENABLED and i == 2:
-                        add = add.copy()
-                        add['snippet'] = 'az ' + add['name']
-                        index['-'].append(add)
-
-        parent = ' '.join(parts[0:-1])
-        completion = {
-            'name': parts[-1],
-            'kind': 'command',
-            'detail': command.name
-        }
-        add_command_documentation(completion, command)
-
-        index[parent].append(completion)
-
-        if TWO_SEGMENTS_COMPLETION_ENABLED and len_parts > 1:
-            add = completion.copy()
-            add['name'] = ' '.join(parts[len_parts - 2:len_parts])
-            index[' '.join(parts[0:len_parts - 2])].append(add)
-            if NO_AZ_PREFIX_COMPLETION_ENABLED and len_parts == 2:
-                add = add.copy()
-                add['snippet'] = 'az ' + add['name']
-                index['-'].append(add)
-    return index
-
-def get_snippets(command_table):
-    snippets = []
-    for command in command_table.values():
-        if command.name.startswith('appservice web'):
+def update_extensions(group_index, command_table, snippets, added, removed, verbose=False):
+    for extension_name in removed:
+        command_names = unload_extension(command_table, extension_name)
+        # Core commands the extension overrode are back in the command table.
+        restored = [ command_name for command_name in command_names if command_name in command_table ]
+        unloaded = [ command_name for command_name in command_names if command_name not in command_table ]
+        remove_from_group_index(group_index, unloaded)
+        remove_snippets(snippets, unloaded)
+        remove_snippet_templates(command_names)
+        USAGE_INDEX.remove(command_names)
+        if USAGE_RANKING_ENABLED:
+            USAGE_INDEX.schedule(restored)
+        if verbose: print('Extension removed ({}, {} commands, {} restored)'.format(extension_name, len(command_names), len(restored)), file=stderr)
+    for extension_name in added:
+        try:
+            command_names = load_extension(command_table, extension_name)
+        except Exception as ex: # pylint: disable=broad-except
+            print('Error loading extension ({}): {}'.format(extension_name, ex), file=stderr)
             continue
-        completion = {
-            'name': ' '.join(reversed(command.name.split())),
-            'kind': 'snippet',
-            'detail': command.name
-        }
-        add_command_documentation(completion, command)
-        snippets.append({
-            'subcommand': command.name,
-            'completion': completion
-        })
-    return snippets
-
-def add_command_documentation(completion, command):
-    help = get_help(command.name)
-    if help:
-        short_summary = help.get('short-summary')
-        if short_summary:
-            completion['documentation'] = short_summary
-            long_summary = help.get('long-summary')
-            if long_summary:
-                completion['documentation'] += '\n\n' + long_summary
-            examples = help.get('examples')
-            if examples:
-                for example in examples:
-                    completion['documentation'] += '\n\n' + example['name'].strip() + '\n' + example['text'].strip()
-
-def get_completions(group_index, command_table, snippets, query, verbose=False):
+        add_to_group_index(group_index, command_names)
+        remove_snippet_templates(command_names) # Overridden core commands might have changed.
+        if AUTOMATIC_SNIPPETS_ENABLED:
+            add_snippets(snippets, command_names)
+        if USAGE_RANKING_ENABLED:
+            USAGE_INDEX.schedule(command_names)
+        if verbose: print('Extension added ({}, {} commands)'.format(extension_name, len(command_names)), file=stderr)
+
+def watch_extensions(queue):
+    installed = get_installed_extensions()
+    while True:
+        time.sleep(EXTENSIONS_WATCH_INTERVAL)
+        current = get_installed_extensions()
+        if current != installed:
+            added = [ name for name, mtime in current.items() if installed.get(name) != mtime ]
+            removed = [ name for name, mtime in installed.items() if current.get(name) != mtime ]
+            queue.put((EXTENSIONS_CHANGED, added, removed))
+            installed = current
+
+def get_completions(group_index, command_table, snippets, query, verbose=False, sent_snippets=None):
     if 'argument' in query:
         return get_argument_value_completions(command_table, query, verbose)
     if 'subcommand' not in query:
-        return get_snippet_completions(command_table, snippets) + get_prefix_command_completions(group_index, command_table) + [AZ_COMPLETION]
+        return get_snippet_completions(command_table, snippets, sent_snippets) + get_prefix_command_completions(group_index, command_table) + [AZ_COMPLETION]
     command_name = query['subcommand']
-    if command_name in command_table:
+    if command_table.get(command_name) is not None: # Imports the command's module when loading lazily, which can fail.
         return get_argument_name_completions(command_table, query) + \
             get_global_argument_name_completions(query)
     if command_name in group_index:
@@ -128,12 +115,15 @@ def get_completions(group_index, command_table, snippets, query, verbose=False):
     if verbose: print('Subcommand not found ({})'.format(command_name), file=stderr)
     return []
 
-def get_snippet_completions(command_table, snippets):
+def get_snippet_completions(command_table, snippets, sent=None):
     return [
         with_snippet(command_table, snippet['subcommand'], 'az ' + snippet['subcommand'], snippet['completion'])
-        for snippet in snippets if arguments_loaded(snippet['subcommand'])
+        for snippet in take_ready_snippets(snippets, arguments_loaded, sent)
     ]
 
+def send_progressive_chunks(command_table, snippets, streams, more):
+    send_chunks(streams, lambda sent: get_snippet_completions(command_table, snippets, sent), write_response, more)
+
 def get_command_completions(group_index, command_table, command_name):
     if not REQUIRED_ARGUMENTS_IN_COMMAND_COMPLETIONS:
         return group_index[command_name]
@@ -153,18 +143,39 @@ def get_prefix_command_completions(group_index, command_table):
     ]
 
 def with_snippet(command_table, subcommand, snippet_prefix, completion):
-    arguments = get_argument_name_completions(command_table, { 'subcommand': subcommand, 'arguments': [] })
-    snippet = snippet_prefix
-    tabstop = 1
-    for argument in arguments:
-        if argument['required'] and not argument['default'] and argument['name'].startswith('--'):
-            snippet += ' ' + argument['name'] + '$' + str(tabstop)
-            tabstop += 1
+    snippet = snippet_prefix + get_snippet_template(command_table, subcommand)
     if snippet != completion['name']:
         completion = completion.copy()
         completion['snippet'] = snippet
     return completion
 
+def get_snippet_template(command_table, subcommand):
+    template = SNIPPET_TEMPLATES.get(subcommand)
+    if template is None:
+        arguments = { name: argument for name, argument in get_arguments(command_table[subcommand]).items()
+            if argument.type.settings.get('help') != '==SUPPRESS==' }
+        defaults = get_defaults(arguments, CONFIGURED_DEFAULTS['defaults'])
+        options = [ option for name, argument in arguments.items() if is_required(argument) and not defaults.get(name)
+            for option in get_options(argument.options_list) if option.startswith('--') ]
+        template = ''.join(' {}${}'.format(option, tabstop) for tabstop, option in enumerate(options, 1))
+        SNIPPET_TEMPLATES[subcommand] = template
+    return template
+
+def remove_snippet_templates(command_names):
+    for command_name in command_names:
+        SNIPPET_TEMPLATES.pop(command_name, None)
+
+def check_configured_defaults():
+    # The config is only reloaded when the file changed, the templates only recomputed when the defaults did.
+    mtime = get_config_mtime()
+    if mtime == CONFIGURED_DEFAULTS['mtime'] and CONFIGURED_DEFAULTS['defaults'] is not None:
+        return
+    CONFIGURED_DEFAULTS['mtime'] = mtime
+    defaults = get_configured_defaults()
+    if defaults != CONFIGURED_DEFAULTS['defaults']:
+        CONFIGURED_DEFAULTS['defaults'] = defaults
+        SNIPPET_TEMPLATES.clear()
+
 def get_argument_name_completions(command_table, query):
     command_name = query['subcommand']
     command = command_table[command_name]
@@ -173,6 +184,10 @@ def get_argument_name_completions(command_table, query):
         if not [ option for option in get_options(argument.options_list) if option in arguments ]
             and argument.type.settings.get('help') != '==SUPPRESS==' }
     defaults = get_defaults(unused)
+    # Aliases of the arguments given count as given for the usage scores.
+    used = [ option for argument in get_arguments(command).values() for options in [ get_options(argument.options_list) ]
+        if set(options).intersection(arguments) for option in options ]
+    scores = USAGE_INDEX.get_scores(command_name, used)
     return [ {
         'name': option,
         'kind': 'argument_name',
@@ -180,29 +195,47 @@ def get_argument_name_completions(command_table, query):
         'default': not not defaults.get(name),
         'detail': 'required' if is_required(argument) and not defaults.get(name) else None,
         'documentation': argument.type.settings.get('help'),
-        'sortText': ('10_' if is_required(argument) and not defaults.get(name) else '20_') + option
+        'sortText': ('10_' if is_required(argument) and not defaults.get(name) else '20_') + get_usage_rank(scores, argument) + '_' + option
     } for name, argument in unused.items() for option in get_options(argument.options_list) ]
 
+def get_usage_rank(scores, argument):
+    score = sum(scores.get(option, 0) for option in get_options(argument.options_list))
+    return '{:04d}'.format(max(0, 9999 - score))
+
+def index_usage(command_table, seconds):
+    """Adds the help examples of scheduled commands to the usage index for up to the given time, returns whether more remain."""
+    end = time.time() + seconds
+    while USAGE_INDEX.has_pending() and time.time() < end:
+        command_name = USAGE_INDEX.take_pending(1)[0]
+        if command_name not in command_table:
+            continue # Removed with its extension.
+        try:
+            USAGE_INDEX.add(command_name, get_example_options(command_name, get_examples(command_name), command_table))
+        except Exception as ex: # pylint: disable=broad-except
+            print('Error indexing examples ({}): {}'.format(command_name, ex), file=stderr)
+    return USAGE_INDEX.has_pending()
+
 def get_argument_value_completions(command_table, query, verbose=False):
-    list = get_argument_value_list(command_table, query, verbose) + \
+    prefix = (query.get('prefix') or '').lstrip('"\'')
+    list = get_argument_value_list(command_table, query, verbose, prefix) + \
         get_global_argument_value_list(query, verbose)
-    return [ {
-        'name': item,
-        'kind': 'argument_value',
-        'snippet': '"' + item + '"' if ' ' in item else item
-    } for item in list ]
+    return get_value_completions(list, prefix, query.get('limit'))
 
-def get_argument_value_list(command_table, query, verbose=False):
+def get_argument_value_list(command_table, query, verbose=False, prefix=''):
     command_name = query['subcommand']
-    if command_name in command_table:
-        command = command_table[command_name]
+    command = command_table.get(command_name)
+    if command is not None:
         argument_name = query['argument']
         _, argument = get_argument(command, argument_name)
         if argument:
             if argument.choices:
                 return argument.choices
             if argument.completer:
-                values = run_argument_value_completer(command, argument, query['arguments'])
+                try:
+                    values = get_completer_values(command_name, command, argument, query['arguments'], prefix)
+                except Exception as ex: # pylint: disable=broad-except
+                    print('Completer failed ({} {}): {}'.format(command_name, argument_name, ex), file=stderr)
+                    values = None
                 if values is not None:
                     return values
                 if verbose: print('Completer not run ({} {})'.format(command_name, argument_name), file=stderr)
@@ -211,6 +244,41 @@ def get_argument_value_list(command_table, query, verbose=False):
     elif verbose: print('Command not found ({})'.format(command_name), file=stderr)
     return []
 
+def get_completer_values(command_name, command, argument, arguments, prefix=''):
+    # Prefetched values are unfiltered, completers run now get the prefix to narrow their results if they support it.
+    # The caller filters and ranks both by the prefix.
+    if PREFETCH_ENABLED:
+        found, values = PREFETCHER.get(get_prefetch_key(command_name, command, argument, arguments), PREFETCHER.max_seconds)
+        if found:
+            return values
+    return run_argument_value_completer(command, argument, arguments, prefix)
+
+def get_prefetch_key(command_name, command, argument, arguments):
+    # The other arguments' values can change the completions (e.g., names within a resource group).
+    others = []
+    for option, value in arguments.items():
+        name, other = get_argument(command, option)
+        if value and other and other is not argument:
+            others.append((name, value))
+    return (command_name, get_options(argument.options_list)[0], tuple(sorted(others)))
+
+def is_argument_name_query(command_table, query):
+    return 'argument' not in query and query.get('subcommand') in command_table
+
+def prefetch_argument_values(command_table, query):
+    command_name = query['subcommand']
+    command = command_table[command_name]
+    arguments = query.get('arguments') or {}
+    given = [ get_argument(command, option)[1] for option in arguments ]
+    candidates = { name: argument for name, argument in get_arguments(command).items()
+        if argument.completer and not argument.choices and argument not in given }
+    defaults = get_defaults(candidates, CONFIGURED_DEFAULTS['defaults'])
+    PREFETCHER.schedule([
+        (get_prefetch_key(command_name, command, argument, arguments), get_completer_name(argument), prepare_argument_value_completer(command, argument, arguments))
+        for name, argument in sorted(candidates.items(), key=lambda e: not is_required(e[1]))
+        if is_required(argument) or defaults.get(name)
+    ])
+
 def get_argument(command, argument_name):
     for name, argument in get_arguments(command).items():
         if argument_name in get_options(argument.options_list):
@@ -238,6 +306,44 @@ def get_global_argument_value_list(query, verbose=False):
         elif verbose: print('Completions not found ({})'.format(argument_name), file=stderr)
     return []
 
+def get_diagnostics():
+    diagnostics = { 'memory': BUDGET.get_stats(), 'prefetch': PREFETCHER.get_stats(), 'usage': USAGE_INDEX.get_stats(), 'requests': dict(REQUEST_STATS) }
+    try:
+        import resource
+        diagnostics['maxrss'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except ImportError:
+        pass # Windows
+    return diagnostics
+
+def update_memory_accounting(group_index, snippets):
+    BUDGET.set_fixed('group_index', estimate_size(group_index))
+    BUDGET.set_fixed('snippets', estimate_size(snippets))
+
+def get_state(group_index, snippets):
+    return {
+        'group_index': group_index,
+        'snippets': snippets,
+        'configured_defaults': CONFIGURED_DEFAULTS['defaults'],
+        'snippet_templates': SNIPPET_TEMPLATES,
+        'prefetch': PREFETCHER.get_entries()
+    }
+
+def get_state_marker():
+    # Changes with the caches written by get_state() and save_state(), unchanged state is not written again.
+    prefetch = PREFETCHER.get_stats()
+    return (BUDGET.get_stats()['caches']['help']['changes'], len(SNIPPET_TEMPLATES), CONFIGURED_DEFAULTS['mtime'], prefetch['runs'], prefetch['running'])
+
+def restore_state(state):
+    # Only caches the current process does not have yet, those might be newer.
+    check_configured_defaults()
+    if state.get('configured_defaults') == CONFIGURED_DEFAULTS['defaults']:
+        for command_name, template in state.get('snippet_templates', {}).items():
+            SNIPPET_TEMPLATES.setdefault(command_name, template)
+    PREFETCHER.add_entries([ (to_tuple(key), at, value) for key, at, value in state.get('prefetch', []) ])
+
+def to_tuple(value):
+    return tuple(to_tuple(item) for item in value) if isinstance(value, list) else value
+
 def get_status():
     subscription = get_current_subscription()
     if not subscription:
@@ -254,7 +360,7 @@ def get_defaults_status():
 
 def get_hover_text(group_index, command_table, command):
     subcommand = command['subcommand']
-    if 'argument' in command and subcommand in command_table:
+    if 'argument' in command and command_table.get(subcommand) is not None:
         argument_name = command['argument']
         argument = next((argument for argument in get_arguments(command_table[subcommand]).values() if argument_name in get_options(argument.options_list)), None)
         if argument:
@@ -266,6 +372,7 @@ def get_hover_text(group_index, command_table, command):
             return { 'paragraphs': [ '`' + ' '.join(argument['options']) + '`: ' + argument['help'] ] }
         return
 
+    command_table.get(subcommand) # Imports the command's module first when loading lazily, for the full help.
     help = get_help(subcommand)
     if help:
         short_summary = help.get('short-summary')
@@ -299,30 +406,36 @@ def get_short_summary(subcommand, fallback):
         return help.get('short-summary', fallback)
     return fallback
 
-def get_options(options):
-    return [ option for option in [
-        option if isinstance(option, str) else
-        option.target if hasattr(option, 'target') else
-        None
-    for option in options ] if option ]
-
 def main():
+    global IMPORT_PROFILER
     timings = False
+    if MEMORY_BUDGET_MB:
+        BUDGET.set_limit(int(float(MEMORY_BUDGET_MB) * 1024 * 1024))
+
     start = time.time()
     initialize()
     if timings: print('initialize {} s'.format(time.time() - start), file=stderr)
 
     start = time.time()
-    command_table = load_command_table()
+    command_table = load_command_table(LAZY_COMMAND_LOADING_ENABLED)
     if timings: print('load_command_table {} s'.format(time.time() - start), file=stderr)
 
     start = time.time()
-    group_index = get_group_index(command_table)
+    state = load_state() if WARM_STATE_ENABLED else None
+    restored = bool(state)
+    if state:
+        restore_state(state)
+    if timings: print('load_state {} s'.format(time.time() - start), file=stderr)
+
+    start = time.time()
+    group_index = state['group_index'] if state and 'group_index' in state else get_group_index(command_table)
     if timings: print('get_group_index {} s'.format(time.time() - start), file=stderr)
 
     start = time.time()
-    snippets = get_snippets(command_table) if AUTOMATIC_SNIPPETS_ENABLED else []
+    snippets = (state['snippets'] if state and 'snippets' in state else get_snippets(command_table)) if AUTOMATIC_SNIPPETS_ENABLED else []
     if timings: print('get_snippets {} s'.format(time.time() - start), file=stderr)
+    update_memory_accounting(group_index, snippets)
+    state = None
 
     def enqueue_output(input, queue):
         for line in iter(input.readline, b''):
@@ -333,44 +446,138 @@ def main():
     thread.daemon = True
     thread.start()
 
+    watcher = Thread(target=watch_extensions, args=(queue,))
+    watcher.daemon = True
+    watcher.start()
+
+    if PREFETCH_ENABLED:
+        PREFETCHER.start()
+
+    if USAGE_RANKING_ENABLED:
+        # Only imported command modules have their help loaded when lazy, the others follow when imported.
+        USAGE_INDEX.schedule(get_loaded_commands(command_table))
+
     bkg_start = time.time()
     keep_loading = True
+    streams = []
+    last_chunk = time.time()
+    saved_marker = get_state_marker() if restored else None
+    last_save = time.time()
+    backlog = [] # Lines taken from the queue while looking for duplicate requests.
     while True:
 
+        if WARM_STATE_ENABLED and time.time() - last_save >= STATE_SAVE_INTERVAL:
+            marker = get_state_marker()
+            if marker != saved_marker:
+                start = time.time()
+                save_state(get_state(group_index, snippets))
+                saved_marker = marker
+                if timings: print('save_state {} s'.format(time.time() - start), file=stderr)
+            last_save = time.time()
+
+        BUDGET.enforce() # Prefetched values are added on another thread without evicting.
         if keep_loading:
             keep_loading = load_arguments(command_table, 10)
             if not keep_loading and timings: print('load_arguments {} s'.format(time.time() - bkg_start), file=stderr)
-
-        try:
-            line = queue.get_nowait() if keep_loading else queue.get()
-        except Empty:
+            if streams and (not keep_loading or time.time() - last_chunk >= PROGRESSIVE_CHUNK_INTERVAL):
+                check_configured_defaults()
+                send_progressive_chunks(command_table, snippets, streams, keep_loading)
+                last_chunk = time.time()
+                if not keep_loading:
+                    streams = []
+        if USAGE_INDEX.has_pending():
+            if not index_usage(command_table, USAGE_INDEX_SLICE) and timings: print('index_usage {} s'.format(time.time() - bkg_start), file=stderr)
+
+        if backlog:
+            line = backlog.pop(0)
+        else:
+            try:
+                line = queue.get_nowait() if keep_loading or USAGE_INDEX.has_pending() else queue.get(timeout=STATE_SAVE_INTERVAL)
+            except Empty:
+                continue
+
+        if isinstance(line, tuple) and line[0] == EXTENSIONS_CHANGED:
+            start = time.time()
+            update_extensions(group_index, command_table, snippets, line[1], line[2], True)
+            update_memory_accounting(group_index, snippets)
+            if timings: print('update_extensions {} s'.format(time.time() - start), file=stderr)
+            keep_loading = True
+            saved_marker = None # Saved with the new extensions key.
             continue
         
         start = time.time()
+        PREFETCHER.set_idle(False)
         request = json.loads(line)
+        sequences = [request['sequence']]
+        key = get_request_key(request['data'])
+        if REQUEST_COALESCING_ENABLED:
+            sequences += take_duplicates(queue, backlog, key)
         response_data = None
+        more = False
         if request['data'].get('request') == 'status':
             response_data = get_status()
             if timings: print('get_status {} s'.format(time.time() - start), file=stderr)
+        elif request['data'].get('request') == 'diagnostics':
+            response_data = get_diagnostics()
+        elif request['data'].get('request') == 'restore_state':
+            # Sent by the supervisor when this process takes over from one that exited.
+            state = load_state()
+            if state:
+                restore_state(state)
+            response_data = { 'restored': bool(state) }
+            state = None
         elif request['data'].get('request') == 'hover':
             response_data = get_hover_text(group_index, command_table, request['data']['command'])
             if timings: print('get_hover_text {} s'.format(time.time() - start), file=stderr)
         else:
-            response_data = get_completions(group_index, command_table, snippets, request['data'], True)
+            check_configured_defaults()
+            # Root completions are sent in chunks as snippets become available, if the client supports that.
+            more = keep_loading and is_progressive(request['data'])
+            sent_snippets = set() if more else None
+            response_data = get_completions(group_index, command_table, snippets, request['data'], True, sent_snippets)
             if timings: print('get_completions {} s'.format(time.time() - start), file=stderr)
-        response = {
-            'sequence': request['sequence'],
-            'data': response_data
-        }
-        output = json.dumps(response)
-        stdout.write(output + '\n')
-        stdout.flush()
-        stderr.flush()
+        if REQUEST_COALESCING_ENABLED:
+            # Arrived while computing.
+            sequences += take_duplicates(queue, backlog, key)
+        REQUEST_STATS['requests'] += len(sequences)
+        REQUEST_STATS['computed'] += 1
+        REQUEST_STATS['coalesced'] += len(sequences) - 1
+        if more:
+            streams += get_streams(sequences, sent_snippets)
+        for sequence in sequences:
+            write_response(sequence, response_data, more)
+        if PREFETCH_ENABLED and is_argument_name_query(command_table, request['data']):
+            # Value completions of the same command likely follow.
+            prefetch_argument_values(command_table, request['data'])
+        PREFETCHER.set_idle(True)
+        if IMPORT_PROFILER:
+            print('first response {} s'.format(time.time() - PROCESS_START), file=stderr)
+            IMPORT_PROFILER.uninstall()
+            IMPORT_PROFILER.report()
+            IMPORT_PROFILER = None
+        if LAZY_COMMAND_LOADING_ENABLED:
+            keep_loading = True # The request might have imported another command module.
+            if USAGE_RANKING_ENABLED:
+                USAGE_INDEX.schedule_new(get_loaded_commands(command_table))
+
+def write_response(sequence, data, more=False):
+    response = {
+        'sequence': sequence,
+        'data': data
+    }
+    if more:
+        response['more'] = True
+    output = json.dumps(response)
+    stdout.write(output + '\n')
+    stdout.flush()
+    stderr.flush()
 
 main()
 
 # {"sequence":4,"data":{"request":"status"}}
+# {"sequence":4,"data":{"request":"diagnostics"}}
 # {"sequence":4,"data":{}}
+# {"sequence":4,"data":{"progressive":true}}
 # {"sequence":4,"data":{"subcommand":""}}
 # {"sequence":4,"data":{"subcommand":"appservice"}}
 # {"sequence":4,"data":{"subcommand":"appservice plan"}}
@@ -385,6 +592,7 @@ main()
 # {"sequence":4,"data":{"subcommand":"webapp browse","argument":"--name","arguments":{}}}
 # {"sequence":4,"data":{"subcommand":"webapp browse","argument":"--name","arguments":{"-g":"chrmarti-group"}}}
 # {"sequence":4,"data":{"subcommand":"webapp browse","argument":"--output","arguments":{}}}
+# {"sequence":4,"data":{"subcommand":"appservice plan create","argument":"--sku","arguments":{"--sku":null},"prefix":"p1","limit":5}}
 # {"sequence":4,"data":{"request":"hover","command":{"subcommand":"appservice"}}}
 # {"sequence":4,"data":{"request":"hover","command":{"subcommand":"appservice something"}}}
 # {"sequence":4,"data":{"request":"hover","command":{"subcommand":"acs create"}}}
@@ -0,0 +1,111 @@
+"""azcli script parsing"""
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+import re
+
+TOKEN = re.compile(r'#.*|(?:"(?:\\.|[^"\\])*"?|\'[^\']*\'?|[^\s"\'])+')
+QUOTED = re.compile(r'"((?:\\.|[^"\\])*)"?|\'([^\']*)\'?')
+SEPARATORS = [';', '&&', '||', '|', '&', 'then', 'do', 'else', '{', '}']
+CONTINUATIONS = ('\\', '`')
+
+
+class Invocation(object):
+    """An 'az ...' invocation found in a script, its tokens still quoted as in the source."""
+
+    def __init__(self, line, tokens):
+        self.line = line
+        self.tokens = tokens
+
+
+class ParsedInvocation(object):
+
+    def __init__(self, command_name, words, arguments):
+        self.command_name = command_name
+        self.words = words
+        self.arguments = arguments
+
+
+def get_logical_lines(text):
+    """Yields (line number, text) with continuation lines joined."""
+    start = None
+    parts = []
+    for number, line in enumerate(text.splitlines(), 1):
+        stripped = line.rstrip()
+        if start is None:
+            start = number
+        if stripped.endswith(CONTINUATIONS):
+            parts.append(stripped[:-1])
+            continue
+        parts.append(stripped)
+        yield start, ' '.join(parts)
+        start = None
+        parts = []
+    if parts:
+        yield start, ' '.join(parts)
+
+
+def tokenize(line):
+    return [ token for token in TOKEN.findall(line) if not token.startswith('#') ]
+
+
+def get_invocations(text):
+    """Finds 'az' invocations in a script, including those in command substitutions like $(az ...)."""
+    for number, line in get_logical_lines(text):
+        invocation = None
+        command_position = True
+        for token in tokenize(line):
+            if invocation is None:
+                if (token == 'az' and command_position) or token.endswith(('$(az', '`az', '(az')):
+                    invocation = []
+                command_position = token in SEPARATORS or token.endswith(('$(', '`', '(')) or QUOTED.sub('', token).endswith(';')
+                continue
+            if token in SEPARATORS:
+                yield Invocation(number, invocation)
+                invocation = None
+                command_position = True
+                continue
+            # Closing parenthesis, backtick or semicolon outside of quotes ends the invocation.
+            bare = QUOTED.sub('', token)
+            trailing = len(bare) - len(bare.rstrip(';)`'))
+            if trailing:
+                if len(token) > trailing:
+                    invocation.append(token[:-trailing])
+                yield Invocation(number, invocation)
+                invocation = None
+                command_position = True
+            else:
+                invocation.append(token)
+        if invocation is not None:
+            yield Invocation(number, invocation)
+
+
+def unquote(token):
+    return QUOTED.sub(lambda m: m.group(1) if m.group(1) is not None else m.group(2), token)
+
+
+def is_dynamic(token):
+    """Whether the token's value is only known when the script runs (variables, command substitution)."""
+    return bool(re.search(r'\$|`', re.sub(r"'[^']*'", '', token)))
+
+
+def parse_invocation(tokens, command_table):
+    """Splits an invocation into the longest known command name, remaining words and (option, values) pairs."""
+    words = []
+    i = 0
+    while i < len(tokens) and not tokens[i].startswith('-'):
+        words.append(unquote(tokens[i]))
+        i += 1
+    arguments = []
+    for token in tokens[i:]:
+        if token.startswith('-') and not re.match(r'^-\d', token):
+            option, _, value = token.partition('=')
+            arguments.append((option, [value] if value else []))
+        elif arguments:
+            arguments[-1][1].append(token)
+    for n in range(len(words), 0, -1):
+        command_name = ' '.join(words[0:n])
+        if command_name in command_table:
+            return ParsedInvocation(command_name, words[n:], arguments)
+    return ParsedInvocation(None, words, arguments)
@@ -0,0 +1,35 @@
+"""request coalescing"""
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+import json
+try:
+    from Queue import Empty
+except ImportError:
+    from queue import Empty # python 3.x
+
+
+def get_request_key(data):
+    return json.dumps(data, sort_keys=True)
+
+
+def take_duplicates(queue, backlog, key):
+    """Moves the lines queued so far to the backlog and removes the requests with the given key from it, returns their sequences."""
+    for _ in range(queue.qsize()):
+        try:
+            backlog.append(queue.get_nowait())
+        except Empty:
+            break
+    sequences = []
+    for line in list(backlog):
+        if isinstance(line, tuple):
+            continue
+        try:
+            request = json.loads(line)
+        except ValueError:
+            continue # Fails when it is its turn.
+        if get_request_key(request['data']) == key:
+            backlog.remove(line)
+            sequences.append(request['sequence'])
+    return sequences
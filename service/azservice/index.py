@@ -0,0 +1,137 @@
+"""command index"""
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+from azservice.tooling import get_help
+
+NO_AZ_PREFIX_COMPLETION_ENABLED = True # Adds proposals without 'az' as prefix to trigger, 'az' is then inserted as part of the completion.
+TWO_SEGMENTS_COMPLETION_ENABLED = False # Adds 'webapp create', 'appservice plan', etc. as proposals.
+
+
+def get_group_index(command_table):
+    index = { '': [], '-': [] }
+    add_to_group_index(index, command_table)
+    return index
+
+
+def add_to_group_index(index, command_names):
+    # Extensions can override core commands, those are already indexed.
+    for command_name in command_names:
+        parts = command_name.split()
+        len_parts = len(parts)
+        if [ completion for completion in index.get(' '.join(parts[0:-1]), []) if completion['kind'] == 'command' and completion.get('detail') == command_name ]:
+            continue
+        for i in range(1, len_parts):
+            group = ' '.join(parts[0:i])
+            if group not in index:
+                index[group] = []
+                parent = ' '.join(parts[0:i - 1])
+                completion = {
+                    'name': parts[i - 1],
+                    'kind': 'group',
+                    'detail': group
+                }
+                help = get_help(group)
+                if help:
+                    description = help.get('short-summary')
+                    if description:
+                        completion['documentation'] = description
+
+                index[parent].append(completion)
+                if NO_AZ_PREFIX_COMPLETION_ENABLED and i == 1:
+                    add = completion.copy()
+                    add['snippet'] = 'az ' + add['name']
+                    index['-'].append(add)
+                
+                if TWO_SEGMENTS_COMPLETION_ENABLED and i > 1:
+                    add = completion.copy()
+                    add['name'] = ' '.join(parts[i - 2:i])
+                    index[' '.join(parts[0:i - 2])].append(add)
+                    if NO_AZ_PREFIX_COMPLETION_ENABLED and i == 2:
+                        add = add.copy()
+                        add['snippet'] = 'az ' + add['name']
+                        index['-'].append(add)
+
+        parent = ' '.join(parts[0:-1])
+        completion = {
+            'name': parts[-1],
+            'kind': 'command',
+            'detail': command_name
+        }
+        add_command_documentation(completion, command_name)
+
+        index[parent].append(completion)
+
+        if TWO_SEGMENTS_COMPLETION_ENABLED and len_parts > 1:
+            add = completion.copy()
+            add['name'] = ' '.join(parts[len_parts - 2:len_parts])
+            index[' '.join(parts[0:len_parts - 2])].append(add)
+            if NO_AZ_PREFIX_COMPLETION_ENABLED and len_parts == 2:
+                add = add.copy()
+                add['snippet'] = 'az ' + add['name']
+                index['-'].append(add)
+
+
+def remove_from_group_index(index, command_names):
+    groups = set()
+    for command_name in command_names:
+        parts = command_name.split()
+        remove_index_entries(index, parts)
+        groups.update(' '.join(parts[0:i]) for i in range(1, len(parts)))
+    # Deepest groups first, so emptied parents are removed as well.
+    for group in sorted(groups, key=lambda group: -len(group.split())):
+        if group in index and not index[group]:
+            del index[group]
+            remove_index_entries(index, group.split())
+
+
+def remove_index_entries(index, parts):
+    # Entries are found by 'detail', which also covers the two segments and no 'az' prefix copies.
+    detail = ' '.join(parts)
+    for key in set([ ' '.join(parts[0:-1]), ' '.join(parts[0:-2]), '-' ]):
+        if key in index:
+            index[key] = [ completion for completion in index[key] if completion.get('detail') != detail ]
+
+
+def get_snippets(command_table):
+    snippets = []
+    add_snippets(snippets, command_table)
+    return snippets
+
+
+def add_snippets(snippets, command_names):
+    existing = set(snippet['subcommand'] for snippet in snippets)
+    for command_name in command_names:
+        if command_name.startswith('appservice web') or command_name in existing:
+            continue
+        completion = {
+            'name': ' '.join(reversed(command_name.split())),
+            'kind': 'snippet',
+            'detail': command_name
+        }
+        add_command_documentation(completion, command_name)
+        snippets.append({
+            'subcommand': command_name,
+            'completion': completion
+        })
+
+
+def remove_snippets(snippets, command_names):
+    removed = set(command_names)
+    snippets[:] = [ snippet for snippet in snippets if snippet['subcommand'] not in removed ]
+
+
+def add_command_documentation(completion, command_name):
+    help = get_help(command_name)
+    if help:
+        short_summary = help.get('short-summary')
+        if short_summary:
+            completion['documentation'] = short_summary
+            long_summary = help.get('long-summary')
+            if long_summary:
+                completion['documentation'] += '\n\n' + long_summary
+            examples = help.get('examples')
+            if examples:
+                for example in examples:
+                    completion['documentation'] += '\n\n' + example['name'].strip() + '\n' + example['text'].strip()
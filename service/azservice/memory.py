@@ -0,0 +1,175 @@
+"""memory budget"""
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+import sys
+import types
+from collections import OrderedDict
+from threading import RLock
+
+NOT_MEASURED = (types.FunctionType, types.MethodType, types.BuiltinFunctionType, types.ModuleType, type)
+
+
+def estimate_size(obj, depth=8, seen=None):
+    """Approximate size in bytes of an object graph, not counting functions, classes and modules it references."""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen or isinstance(obj, NOT_MEASURED):
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if depth == 0:
+        return size
+    if isinstance(obj, dict):
+        size += sum(estimate_size(key, depth - 1, seen) + estimate_size(value, depth - 1, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, depth - 1, seen) for item in obj)
+    elif hasattr(obj, '__dict__'):
+        size += estimate_size(obj.__dict__, depth - 1, seen)
+    return size
+
+
+class MemoryBudget(object):
+    """Byte budget shared by several caches, evicting the least recently used entries across all of them.
+
+    Caches used from other threads hold `lock` while changing their entries and add them with `evict=False`,
+    evictions then happen on the next add or enforce() of the thread owning the other caches."""
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.size = 0
+        self.lock = RLock()
+        self._entries = OrderedDict()
+        self._caches = OrderedDict()
+        self._fixed = OrderedDict()
+
+    def set_limit(self, limit):
+        self.limit = limit
+        self.enforce()
+
+    def register(self, cache):
+        self._caches[cache.name] = cache
+
+    def set_fixed(self, name, size):
+        """Accounts for a structure that is not evictable (e.g., the group index)."""
+        with self.lock:
+            self.size += size - self._fixed.get(name, 0)
+            self._fixed[name] = size
+        self.enforce()
+
+    def add(self, cache, key, size, evict=True):
+        with self.lock:
+            self.discard(cache, key)
+            self._entries[(cache.name, key)] = size
+            self.size += size
+            cache.size += size
+        if evict:
+            self.enforce()
+
+    def touch(self, cache, key):
+        entry = (cache.name, key)
+        with self.lock:
+            if entry in self._entries:
+                self._entries[entry] = self._entries.pop(entry)
+
+    def discard(self, cache, key):
+        with self.lock:
+            size = self._entries.pop((cache.name, key), 0)
+            self.size -= size
+            cache.size -= size
+
+    def enforce(self):
+        """Evicts least recently used entries until the budget is met."""
+        with self.lock:
+            # The most recent entry is kept even when it alone exceeds the budget.
+            while self.limit is not None and self.size > self.limit and len(self._entries) > 1:
+                (name, key), size = self._entries.popitem(last=False)
+                cache = self._caches[name]
+                self.size -= size
+                cache.size -= size
+                cache.evictions += 1
+                cache.evict(key)
+
+    def get_stats(self):
+        with self.lock:
+            caches = OrderedDict((name, cache.get_stats()) for name, cache in self._caches.items())
+            for name, size in self._fixed.items():
+                caches[name] = {'size': size}
+            return {
+                'limit': self.limit,
+                'size': self.size,
+                'caches': caches
+            }
+
+
+class BudgetedCache(object):
+    """Dictionary-like cache whose entries are accounted for in a MemoryBudget and evicted under its LRU policy."""
+
+    def __init__(self, name, budget, sizeof=estimate_size, on_evict=None):
+        self.name = name
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.changes = 0 # Entries added, removed or evicted.
+        self._data = {}
+        self._budget = budget
+        self._sizeof = sizeof
+        self._on_evict = on_evict
+        budget.register(self)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def __getitem__(self, key):
+        value = self._data[key]
+        self._budget.touch(self, key)
+        return value
+
+    def __setitem__(self, key, value):
+        self._data[key] = value
+        self.changes += 1
+        self._budget.add(self, key, self._sizeof(value))
+
+    def get(self, key, default=None):
+        if key in self._data:
+            self.hits += 1
+            return self[key]
+        self.misses += 1
+        return default
+
+    def items(self):
+        return list(self._data.items())
+
+    def pop(self, key, default=None):
+        self._budget.discard(self, key)
+        if key in self._data:
+            self.changes += 1
+        return self._data.pop(key, default)
+
+    def clear(self):
+        for key in list(self._data):
+            self.pop(key)
+
+    def evict(self, key):
+        value = self._data.pop(key, None)
+        self.changes += 1
+        if self._on_evict:
+            self._on_evict(key, value)
+
+    def get_stats(self):
+        return {
+            'entries': len(self._data),
+            'size': self.size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'changes': self.changes
+        }
+
+
+BUDGET = MemoryBudget()
@@ -0,0 +1,176 @@
+"""speculative prefetch"""
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+from __future__ import print_function
+
+import time
+from collections import OrderedDict
+from sys import stderr
+from threading import Condition, Event, Thread
+
+from azservice.memory import estimate_size
+
+
+class Prefetcher(object):
+    """Runs jobs on a background thread while the service is idle, keeping their results in a small LRU cache.
+
+    Jobs run one at a time, at most one per `interval` seconds. Scheduling replaces the jobs not yet started,
+    so only the most recent guesses run. Jobs of a kind taking longer than `max_seconds` are not prefetched again.
+    Jobs run concurrently with the caller, state shared with it is to be resolved when the job is created.
+    With a `budget`, the cached results are accounted in it as cache 'prefetch' and evicted under its policy."""
+
+    def __init__(self, max_entries=64, ttl=60, interval=1, max_seconds=5, excluded=(), budget=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.excluded = set(excluded)
+        self._cache = OrderedDict() # key -> (time, value)
+        self._pending = OrderedDict() # key -> (kind, job)
+        self._running = {} # key -> Event
+        self._idle = True
+        self._last_run = 0
+        self._condition = Condition(budget.lock if budget else None)
+        self._stats = { 'scheduled': 0, 'runs': 0, 'errors': 0, 'hits': 0, 'misses': 0 }
+        self._thread = None
+        self._budget = budget
+        self._account = _Account(self)
+        if budget:
+            budget.register(self._account)
+
+    def start(self):
+        self._thread = Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def schedule(self, jobs):
+        """Replaces the pending jobs with the given (key, kind, job) tuples, `job` is a function without arguments."""
+        with self._condition:
+            self._pending.clear()
+            for key, kind, job in jobs:
+                if kind not in self.excluded and key not in self._running and not self._get_fresh(key):
+                    self._pending[key] = (kind, job)
+                    self._stats['scheduled'] += 1
+            self._condition.notify()
+
+    def get(self, key, timeout=None):
+        """Returns (True, value) if the result for the key is cached or running and finishes within the timeout."""
+        with self._condition:
+            self._pending.pop(key, None)
+            running = self._running.get(key)
+        if running:
+            running.wait(timeout)
+        with self._condition:
+            entry = self._get_fresh(key)
+            if entry:
+                self._cache[key] = self._cache.pop(key)
+                if self._budget:
+                    self._budget.touch(self._account, key)
+                self._stats['hits'] += 1
+                return True, entry[1]
+            self._stats['misses'] += 1
+            return False, None
+
+    def get_entries(self):
+        """Cached results as (key, time, value) tuples, to be passed to add_entries() of another instance."""
+        with self._condition:
+            return [ (key, at, value) for key, (at, value) in self._cache.items() ]
+
+    def add_entries(self, entries):
+        for key, at, value in entries:
+            if time.time() - at <= self.ttl:
+                size = estimate_size(value) if self._budget else 0
+                with self._condition:
+                    if key not in self._cache:
+                        self._store(key, at, value, size)
+
+    def set_idle(self, idle):
+        with self._condition:
+            self._idle = idle
+            self._condition.notify()
+
+    def get_stats(self):
+        with self._condition:
+            stats = dict(self._stats)
+            stats.update({ 'entries': len(self._cache), 'pending': len(self._pending), 'running': len(self._running), 'excluded': sorted(self.excluded) })
+            return stats
+
+    def _get_fresh(self, key):
+        entry = self._cache.get(key)
+        if entry and time.time() - entry[0] > self.ttl:
+            self._remove(key)
+            return None
+        return entry
+
+    def _store(self, key, at, value, size):
+        self._cache.pop(key, None)
+        self._cache[key] = (at, value)
+        if self._budget:
+            # Evicted by the budget's owner, evictions would run on this thread otherwise.
+            self._budget.add(self._account, key, size, evict=False)
+        while len(self._cache) > self.max_entries:
+            self._remove(next(iter(self._cache)))
+
+    def _remove(self, key):
+        del self._cache[key]
+        if self._budget:
+            self._budget.discard(self._account, key)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not (self._idle and self._pending):
+                    self._condition.wait()
+                delay = self._last_run + self.interval - time.time()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+                key, (kind, job) = self._pending.popitem(last=False)
+                if kind in self.excluded:
+                    continue
+                done = self._running[key] = Event()
+                self._last_run = time.time()
+                self._stats['runs'] += 1
+
+            start = time.time()
+            try:
+                value = job()
+                failed = False
+            except Exception as ex: # pylint: disable=broad-except
+                print('Prefetch failed ({}): {}'.format(kind, ex), file=stderr)
+                value = None
+                failed = True
+            duration = time.time() - start
+            size = estimate_size(value) if self._budget and not failed else 0
+
+            with self._condition:
+                if failed:
+                    self._stats['errors'] += 1
+                else:
+                    self._store(key, time.time(), value, size)
+                if duration > self.max_seconds:
+                    print('Prefetch disabled for slow completer ({}, {:.1f} s)'.format(kind, duration), file=stderr)
+                    self.excluded.add(kind)
+                del self._running[key]
+                done.set()
+
+
+class _Account(object):
+    """The prefetched results' part of a MemoryBudget, the interface of a BudgetedCache the budget uses."""
+
+    def __init__(self, prefetcher):
+        self.name = 'prefetch'
+        self.size = 0
+        self.evictions = 0
+        self._prefetcher = prefetcher
+
+    def evict(self, key):
+        with self._prefetcher._condition:
+            self._prefetcher._cache.pop(key, None)
+
+    def get_stats(self):
+        with self._prefetcher._condition:
+            entries = len(self._prefetcher._cache)
+        return { 'entries': entries, 'size': self.size, 'evictions': self.evictions }
@@ -0,0 +1,94 @@
+"""import time profiling"""
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+from __future__ import print_function
+
+import sys
+import threading
+import time
+from sys import stderr
+
+REPORT_THRESHOLD = 0.001 # Seconds, imports taking less are left out of the report.
+
+
+class ImportNode(object):
+
+    def __init__(self, name):
+        self.name = name
+        self.cumulative = 0.0
+        self.children = []
+
+    def self_time(self):
+        return self.cumulative - sum(child.cumulative for child in self.children)
+
+
+class ImportProfiler(object):
+    """Meta path finder timing the execution of each imported module, including its nested imports."""
+
+    def __init__(self):
+        self.root = ImportNode('')
+        self.active = False
+        self._local = threading.local()
+
+    def install(self):
+        self.active = True
+        sys.meta_path.insert(0, self)
+
+    def uninstall(self):
+        self.active = False
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self:
+                continue
+            find_spec = getattr(finder, 'find_spec', None)
+            if not find_spec:
+                return None # Leave legacy finders to the import system.
+            spec = find_spec(fullname, path, target)
+            if spec is not None:
+                # Class loaders (builtin, frozen) are shared, only instances are wrapped.
+                if spec.loader is not None and not isinstance(spec.loader, type) and hasattr(spec.loader, 'exec_module'):
+                    self._wrap(spec.loader, fullname)
+                return spec
+        return None
+
+    def _wrap(self, loader, fullname):
+        exec_module = loader.exec_module
+
+        def timed_exec_module(module):
+            if not self.active:
+                return exec_module(module)
+            stack = self._stack()
+            node = ImportNode(fullname)
+            stack[-1].children.append(node)
+            stack.append(node)
+            start = time.time()
+            try:
+                return exec_module(module)
+            finally:
+                node.cumulative = time.time() - start
+                stack.pop()
+
+        loader.exec_module = timed_exec_module
+
+    def _stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = [self.root]
+        return self._local.stack
+
+    def report(self, file=stderr, threshold=REPORT_THRESHOLD):
+        total = sum(child.cumulative for child in self.root.children)
+        print('import time: self [ms] | cumulative [ms] | module (total {:.1f} ms)'.format(total * 1000), file=file)
+        self._report(self.root.children, 0, file, threshold)
+        file.flush()
+
+    def _report(self, nodes, depth, file, threshold):
+        for node in sorted(nodes, key=lambda node: -node.cumulative):
+            if node.cumulative < threshold:
+                break
+            print('{:>21.1f} | {:>15.1f} | {}{}'.format(node.self_time() * 1000, node.cumulative * 1000, '  ' * depth, node.name), file=file)
+            self._report(node.children, depth + 1, file, threshold)
@@ -0,0 +1,31 @@
+"""progressive completions"""
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+
+def is_progressive(query):
+    return query.get('progressive') and 'argument' not in query and 'subcommand' not in query
+
+
+def take_ready_snippets(snippets, is_ready, sent=None):
+    """Snippets of the commands `is_ready` accepts, without those in `sent`, which is updated with the ones returned."""
+    ready = [ snippet for snippet in snippets if is_ready(snippet['subcommand'])
+        and (sent is None or snippet['subcommand'] not in sent) ]
+    if sent is not None:
+        sent.update(snippet['subcommand'] for snippet in ready)
+    return ready
+
+
+def get_streams(sequences, sent):
+    """Streams of follow-up chunks, one per sequence answered (coalesced requests each get their own)."""
+    return [ { 'sequence': sequence, 'sent': set(sent) } for sequence in sequences ]
+
+
+def send_chunks(streams, get_chunk, write, more):
+    """Writes the chunk `get_chunk` returns for each stream, empty ones only as the final chunk (`more` False)."""
+    for stream in streams:
+        chunk = get_chunk(stream['sent'])
+        if chunk or not more:
+            write(stream['sequence'], chunk, more)
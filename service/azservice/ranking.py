@@ -0,0 +1,39 @@
+"""argument value ranking"""
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+
+def get_value_completions(values, prefix, limit=None):
+    ranked = rank_values(values, prefix, limit)
+    width = len(str(len(ranked)))
+    return [ {
+        'name': item,
+        'kind': 'argument_value',
+        'snippet': '"' + item + '"' if ' ' in item else item,
+        'sortText': str(i).zfill(width) # The editor keeps the service's order.
+    } for i, (_, item) in enumerate(ranked) ]
+
+
+def rank_values(values, prefix, limit=None):
+    # Exact prefix matches first, then prefix matches ignoring case, then substring matches.
+    lower = prefix.lower()
+    ranked = []
+    seen = set()
+    for value in values:
+        item = str(value)
+        if item in seen:
+            continue
+        seen.add(item)
+        if item.startswith(prefix):
+            rank = 0
+        elif item.lower().startswith(lower):
+            rank = 1
+        elif lower in item.lower():
+            rank = 2
+        else:
+            continue
+        ranked.append((rank, item))
+    ranked.sort(key=lambda e: (e[0], e[1].lower()))
+    return ranked[:limit] if limit else ranked
@@ -0,0 +1,160 @@
+"""worker supervisor"""
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+from __future__ import print_function
+
+import json
+import os
+import subprocess
+import sys
+import time
+from sys import stdin, stdout, stderr
+from threading import Lock, Thread
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAX_RESTARTS = 3 # Gives up after this many worker exits within RESTART_WINDOW, the client then sees the exit.
+RESTART_WINDOW = 60 # Seconds.
+RESTORE_SEQUENCE = -1 # Sequence of the restore_state request, negative to not collide with client sequences.
+
+
+class Worker(object):
+    """az-service process running the stdin/stdout protocol, its responses are read on a background thread."""
+
+    def __init__(self, command, on_line, on_exit):
+        env = dict(os.environ)
+        env['PYTHONPATH'] = SERVICE_DIR + os.pathsep + env.get('PYTHONPATH', '')
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=env, universal_newlines=True)
+        self._on_line = on_line
+        self._on_exit = on_exit
+        thread = Thread(target=self._read)
+        thread.daemon = True
+        thread.start()
+
+    def send(self, line):
+        try:
+            self.process.stdin.write(line if line.endswith('\n') else line + '\n')
+            self.process.stdin.flush()
+        except (IOError, OSError, ValueError):
+            pass # Exited, handled by the reader thread.
+
+    def kill(self):
+        try:
+            self.process.kill()
+        except OSError:
+            pass
+
+    def _read(self):
+        for line in iter(self.process.stdout.readline, ''):
+            self._on_line(self, line)
+        self._on_exit(self, self.process.wait())
+
+
+class Supervisor(object):
+    """Forwards requests to the active worker and keeps a warm standby worker started after the active one responded.
+
+    When the active worker exits, the standby takes over: it is told to restore the state the exited worker saved,
+    requests without response are sent again once, progressive completions that were partially sent are ended."""
+
+    def __init__(self, command, write=None):
+        self.command = command
+        self.write = write or write_line
+        self.active = None
+        self.standby = None
+        self.pending = {} # sequence -> { 'line', 'chunks', 'retried' }
+        self.exits = []
+        self._lock = Lock()
+        self._closed = False
+
+    def start(self):
+        with self._lock:
+            self.active = self._spawn()
+
+    def send(self, line):
+        request = json.loads(line)
+        with self._lock:
+            self.pending[request['sequence']] = { 'line': line, 'chunks': 0, 'retried': False }
+            self.active.send(line)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            for worker in (self.active, self.standby):
+                if worker:
+                    worker.kill()
+
+    def _spawn(self):
+        return Worker(self.command, self._on_line, self._on_exit)
+
+    def _on_line(self, worker, line):
+        with self._lock:
+            if worker is not self.active:
+                return
+            if not self.standby:
+                self.standby = self._spawn()
+            response = json.loads(line)
+            entry = self.pending.get(response['sequence'])
+            if not entry:
+                return # restore_state or a request already answered.
+            if response.get('more'):
+                entry['chunks'] += 1
+            else:
+                del self.pending[response['sequence']]
+            self.write(line)
+
+    def _on_exit(self, worker, code):
+        with self._lock:
+            if self._closed:
+                return
+            if worker is self.standby:
+                print('Standby worker exited (exit code {})'.format(code), file=stderr)
+                self.standby = None
+                return
+            if worker is not self.active:
+                return
+            now = time.time()
+            self.exits = [ at for at in self.exits if now - at < RESTART_WINDOW ] + [now]
+            if len(self.exits) > MAX_RESTARTS:
+                print('Worker exited {} times within {} s, giving up (exit code {})'.format(len(self.exits), RESTART_WINDOW, code), file=stderr)
+                self._closed = True
+                if self.standby:
+                    self.standby.kill()
+                stdout.flush()
+                os._exit(code or 1) # The main thread is blocked reading stdin.
+            print('Worker exited (exit code {}), {} takes over'.format(code, 'standby' if self.standby else 'new worker'), file=stderr)
+            self.active = self.standby or self._spawn()
+            self.standby = None
+            self.active.send(json.dumps({ 'sequence': RESTORE_SEQUENCE, 'data': { 'request': 'restore_state' } }))
+            for sequence, entry in sorted(self.pending.items()):
+                if entry['chunks']:
+                    # Progressive completions, the chunks sent are a valid result.
+                    del self.pending[sequence]
+                    self.write(json.dumps({ 'sequence': sequence, 'data': [] }))
+                elif entry['retried']:
+                    # Sent to the exited worker a second time, likely what makes it exit.
+                    del self.pending[sequence]
+                    data = json.loads(entry['line'])['data']
+                    self.write(json.dumps({ 'sequence': sequence, 'data': None if data.get('request') else [] }))
+                else:
+                    entry['retried'] = True
+                    self.active.send(entry['line'])
+
+
+STDOUT_LOCK = Lock()
+def write_line(line):
+    with STDOUT_LOCK:
+        stdout.write(line if line.endswith('\n') else line + '\n')
+        stdout.flush()
+
+
+def supervise(argv):
+    supervisor = Supervisor([sys.executable, '-m', 'azservice'] + [ arg for arg in argv[1:] if arg != '--supervise' ])
+    supervisor.start()
+    try:
+        for line in iter(stdin.readline, ''):
+            if line.strip():
+                supervisor.send(line)
+    finally:
+        supervisor.close()
+    return 0
@@ -4,9 +4,17 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
-from distutils.version import LooseVersion
 from azure.cli.core import __version__
-if LooseVersion(__version__) < LooseVersion('2.0.24'):
-    from azservice.tooling1 import GLOBAL_ARGUMENTS, initialize, load_command_table, get_help, get_current_subscription, get_configured_defaults, get_defaults, is_required, run_argument_value_completer, get_arguments, load_arguments, arguments_loaded
+from azservice import version_tuple
+if version_tuple(__version__) < (2, 0, 24):
+    from azservice.tooling1 import GLOBAL_ARGUMENTS, initialize, load_command_table, get_help, get_current_subscription, get_configured_defaults, get_defaults, is_required, run_argument_value_completer, get_arguments, load_arguments, arguments_loaded, get_loaded_commands, get_installed_extensions, load_extension, unload_extension, get_config_mtime, prepare_argument_value_completer, get_completer_name, save_state, load_state, get_examples
 else:
-    from azservice.tooling2 import GLOBAL_ARGUMENTS, initialize, load_command_table, get_help, get_current_subscription, get_configured_defaults, get_defaults, is_required, run_argument_value_completer, get_arguments, load_arguments, arguments_loaded
+    from azservice.tooling2 import GLOBAL_ARGUMENTS, initialize, load_command_table, get_help, get_current_subscription, get_configured_defaults, get_defaults, is_required, run_argument_value_completer, get_arguments, load_arguments, arguments_loaded, get_loaded_commands, get_installed_extensions, load_extension, unload_extension, get_config_mtime, prepare_argument_value_completer, get_completer_name, save_state, load_state, get_examples
+
+
+def get_options(options):
+    return [ option for option in [
+        option if isinstance(option, str) else
+        option.target if hasattr(option, 'target') else
+        None
+    for option in options ] if option ]
@@ -23,6 +23,8 @@ from azure.cli.core._config import az_config, GLOBAL_CONFIG_PATH, DEFAULTS_SECTI
 from azure.cli.core.help_files import helps
 from azure.cli.core.util import CLIError
 
+from azservice.memory import BUDGET, BudgetedCache
+
 
 GLOBAL_ARGUMENTS = {
     'verbose': {
@@ -61,13 +63,33 @@ def _load_profile():
     ACCOUNT.load(os.path.join(azure_folder, 'azureProfile.json'))
 
 
-def load_command_table():
+def load_command_table(lazy=False):
     APPLICATION.initialize(Configuration())
     command_table = APPLICATION.configuration.get_command_table()
     _install_modules(command_table)
     return command_table
 
 
+def get_installed_extensions():
+    return {}
+
+
+def load_extension(cmd_table, extension_name):
+    return []
+
+
+def unload_extension(cmd_table, extension_name):
+    return []
+
+
+def save_state(state):
+    pass
+
+
+def load_state():
+    return None
+
+
 def get_arguments(command):
     return command.arguments
 
@@ -76,6 +98,10 @@ def arguments_loaded(command_name):
     return True
 
 
+def get_loaded_commands(cmd_table):
+    return list(cmd_table)
+
+
 def load_arguments(cmd_table, batch):
     return False
 
@@ -103,13 +129,20 @@ def _install_modules(command_table):
     _update_command_definitions(command_table)
 
 
-HELP_CACHE = {}
+HELP_CACHE = BudgetedCache('help', BUDGET)
 
 
 def get_help(group_or_command):
-    if group_or_command not in HELP_CACHE and group_or_command in helps:
-        HELP_CACHE[group_or_command] = yaml.load(helps[group_or_command])
-    return HELP_CACHE.get(group_or_command)
+    help = HELP_CACHE.get(group_or_command)
+    if help is None and group_or_command in helps:
+        help = HELP_CACHE[group_or_command] = yaml.load(helps[group_or_command])
+    return help
+
+
+def get_examples(command_name):
+    """Example texts of the command's help, without adding the help to the cache."""
+    help = HELP_CACHE[command_name] if command_name in HELP_CACHE else yaml.load(helps[command_name]) if command_name in helps else None
+    return [ example['text'] for example in (help or {}).get('examples') or [] if example.get('text') ]
 
 
 PROFILE = Profile()
@@ -142,29 +175,57 @@ def is_required(argument):
     return required_tooling and argument.name != 'is_linux'
 
 
-def get_defaults(arguments):
+def get_defaults(arguments, configured_defaults=None):
+    if configured_defaults is not None:
+        # Snapshot from get_configured_defaults(), avoids reloading the config.
+        return {name: configured_defaults.get(getattr(argument.type, 'default_name_tooling', None)) or argument.type.settings.get('default')
+            for name, argument in arguments.items()}
     _reload_config()
     return {name: _get_default(argument) for name, argument in arguments.items()}
 
 
+def get_config_mtime():
+    try:
+        return os.path.getmtime(GLOBAL_CONFIG_PATH)
+    except OSError:
+        return None
+
+
 def _get_default(argument):
     configured = _find_configured_default(argument)
     return configured or argument.type.settings.get('default')
 
 
-def run_argument_value_completer(command, argument, cli_arguments):
+def run_argument_value_completer(command, argument, cli_arguments, prefix=''):
+    return prepare_argument_value_completer(command, argument, cli_arguments, prefix)()
+
+
+def prepare_argument_value_completer(command, argument, cli_arguments, prefix=''):
+    """Resolves the completer's arguments and defaults now, the returned function can run later on another thread."""
     try:
         args = _to_argument_object(command, cli_arguments)
         _add_defaults(command, args)
-        return argument.completer('', '', args)
     except TypeError:
+        args = None
+
+    def run():
+        if args is not None:
+            try:
+                return argument.completer(prefix, '', args)
+            except TypeError:
+                pass
         try:
-            return argument.completer('')
+            return argument.completer(prefix)
         except TypeError:
             try:
                 return argument.completer()
             except TypeError:
                 return None
+    return run
+
+
+def get_completer_name(argument):
+    return getattr(argument.completer, '__name__', type(argument.completer).__name__)
 
 
 def _to_argument_object(command, cli_arguments):
@@ -5,21 +5,26 @@
 # --------------------------------------------------------------------------------------------
 from __future__ import print_function
 
-import yaml
-
-from six.moves import configparser
-from distutils.version import LooseVersion
-
-from knack.config import CLIConfig
-from knack.help_files import helps
+import os
+import sys
+import json
+import traceback
+from sys import stderr
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping  # python 2.x
 
 from azure.cli.core import get_default_cli, __version__
-from azure.cli.core._profile import _SUBSCRIPTION_NAME, Profile
-from azure.cli.core.util import CLIError
 from azure.cli.core._config import GLOBAL_CONFIG_PATH, GLOBAL_CONFIG_DIR, ENV_VAR_PREFIX
 
+from azservice import __version__ as service_version, version_tuple
+from azservice.memory import BUDGET, BudgetedCache, estimate_size
 
-before_2_0_64 = LooseVersion(__version__) < LooseVersion('2.0.64')
+# Modules only needed for status, help or defaults (yaml, knack.config, azure.cli.core._profile)
+# are imported on first use to shorten the startup.
+
+before_2_0_64 = version_tuple(__version__) < (2, 0, 64)
 
 GLOBAL_ARGUMENTS = {
     'verbose': {
@@ -33,7 +38,7 @@ GLOBAL_ARGUMENTS = {
     'output': {
         'options': ['--output', '-o'],
         'help': 'Output format',
-        'choices': ['json', 'tsv', 'table', 'jsonc']
+        'choices': ['json', 'jsonc', 'yaml', 'yamlc', 'table', 'tsv', 'none']
     },
     'help': {
         'options': ['--help', '-h'],
@@ -42,6 +47,10 @@ GLOBAL_ARGUMENTS = {
     'query': {
         'options': ['--query'],
         'help': 'JMESPath query string. See http://jmespath.org/ for more information and examples.'
+    },
+    'only_show_errors': {
+        'options': ['--only-show-errors'],
+        'help': 'Only show errors, suppressing warnings.'
     }
 }
 
@@ -52,12 +61,26 @@ def initialize():
     cli_ctx = get_default_cli()
 
 
-def load_command_table():
+def load_command_table(lazy=False):
     invoker = cli_ctx.invocation_cls(cli_ctx=cli_ctx, commands_loader_cls=cli_ctx.commands_loader_cls, parser_cls=cli_ctx.parser_cls, help_cls=cli_ctx.help_cls)
     cli_ctx.invocation = invoker
+    # The commands of the new loader have no arguments loaded yet.
+    ARGUMENTS_LOADED.clear()
+    ARGUMENTS_CACHE.clear()
 
     # turn off applicability check for main loader and load command table
     invoker.commands_loader.skip_applicability = True
+
+    manifest = _read_manifest() if lazy else None
+    if manifest:
+        cmd_tbl = LazyCommandTable(invoker.commands_loader.command_table, manifest['modules'])
+        MANIFEST_HELP.update(manifest['help'])
+        EXTENSION_COMMANDS.clear()
+        for module in manifest['modules'].values():
+            if module.get('extension'):
+                EXTENSION_COMMANDS.setdefault(module['extension'], []).extend(module['commands'])
+        return cmd_tbl
+
     cmd_tbl = invoker.commands_loader.load_command_table(None)
 
     # turn off applicability check for all loaders
@@ -65,45 +88,348 @@ def load_command_table():
         for loader in loaders:
             loader.skip_applicability = True
 
+    EXTENSION_COMMANDS.clear()
+    for name, command in cmd_tbl.items():
+        extension_name = getattr(command.command_source, 'extension_name', None)
+        if extension_name:
+            EXTENSION_COMMANDS.setdefault(extension_name, []).append(name)
+
+    if lazy:
+        _write_manifest(cmd_tbl)
     return cmd_tbl
 
 
+class LazyCommandTable(MutableMapping):
+    """Command table backed by a manifest of command names, importing a command module when one of its commands is first accessed."""
+
+    def __init__(self, loaded, modules):
+        self._loaded = loaded
+        self._modules = modules
+        self._command_modules = {}
+        self._loaded_modules = set()
+        # Extensions last, so their commands override those of the built-in modules.
+        for module_name in sorted(modules, key=lambda module_name: bool(modules[module_name].get('extension'))):
+            for name in modules[module_name]['commands']:
+                self._command_modules.setdefault(name, []).append(module_name)
+
+    def __getitem__(self, name):
+        if name not in self._loaded:
+            for module_name in list(self._command_modules[name]):
+                self._load_module(module_name)
+            if name not in self._loaded:
+                # The module failed to import or no longer has the command.
+                self._command_modules.pop(name, None)
+        return self._loaded[name]
+
+    def __setitem__(self, name, command):
+        self._command_modules.setdefault(name, [])
+        self._loaded[name] = command
+
+    def __delitem__(self, name):
+        del self._command_modules[name]
+        self._loaded.pop(name, None)
+
+    def __contains__(self, name):
+        return name in self._command_modules
+
+    def __iter__(self):
+        return iter(self._command_modules)
+
+    def __len__(self):
+        return len(self._command_modules)
+
+    def pop(self, name, *default):
+        if name in self._command_modules:
+            del self._command_modules[name]
+        return self._loaded.pop(name, *default)
+
+    def loaded_names(self):
+        return list(self._loaded)
+
+    def _load_module(self, module_name):
+        if module_name in self._loaded_modules:
+            return
+        self._loaded_modules.add(module_name)
+        module = self._modules[module_name]
+        try:
+            if module.get('path') and module['path'] not in sys.path:
+                sys.path.append(module['path'])
+            _load_command_module(module_name, module.get('extension'))
+        except Exception:  # pylint: disable=broad-except
+            print("Error loading: {}".format(module_name), file=stderr)
+            traceback.print_exc(file=stderr)
+            # Keeps 'in' consistent with lookups, commands also provided by another module stay.
+            for name in module['commands']:
+                module_names = self._command_modules.get(name)
+                if module_names and module_name in module_names:
+                    module_names.remove(module_name)
+                    if not module_names and name not in self._loaded:
+                        del self._command_modules[name]
+
+
+def _load_command_module(module_name, extension_name=None):
+    from azure.cli.core.commands import _load_extension_command_loader, ExtensionCommandSource
+
+    commands_loader = cli_ctx.invocation.commands_loader
+    # Loads any module by its full name, not only extensions.
+    result = _load_extension_command_loader(commands_loader, None, module_name)
+    command_table, group_table = result[0], result[1]
+    command_loader = result[2] if len(result) > 2 else None  # Older versions update the map themselves.
+
+    if command_loader:
+        command_loader.skip_applicability = True
+        commands_loader.loaders.append(command_loader)
+        for name in command_table:
+            commands_loader.cmd_to_loader_map.setdefault(name, []).append(command_loader)
+
+    for name, command in command_table.items():
+        existing = commands_loader.command_table.get(name)
+        if extension_name:
+            command.command_source = ExtensionCommandSource(extension_name=extension_name, overrides_command=existing is not None)
+        elif isinstance(getattr(existing, 'command_source', None), ExtensionCommandSource):
+            continue  # Keep the extension's override.
+        else:
+            command.command_source = module_name.split('.')[-1]
+        commands_loader.command_table[name] = command
+    commands_loader.command_group_table.update(group_table)
+    return command_table
+
+
+MANIFEST_HELP = {}
+def _get_manifest_path():
+    return os.path.join(GLOBAL_CONFIG_DIR, 'azServiceManifest.json')
+
+
+def _get_manifest_key():
+    return {'version': __version__, 'extensions': get_installed_extensions()}
+
+
+def _read_manifest():
+    try:
+        with open(_get_manifest_path()) as f:
+            manifest = json.load(f)
+    except (IOError, OSError, ValueError):
+        return None
+    return manifest if manifest.get('key') == _get_manifest_key() else None
+
+
+def _write_manifest(cmd_tbl):
+    modules = {}
+    names = set()
+    for name, command in cmd_tbl.items():
+        extension_name = getattr(command.command_source, 'extension_name', None)
+        for loader in cli_ctx.invocation.commands_loader.cmd_to_loader_map.get(name, []):
+            parts = loader.__module__.split('.')
+            is_extension = parts[0].startswith('azext')
+            module_name = parts[0] if is_extension else '.'.join(parts[0:4])
+            module = modules.setdefault(module_name, {'commands': []})
+            module['commands'].append(name)
+            if is_extension:
+                module['extension'] = extension_name
+                module['path'] = os.path.dirname(os.path.dirname(sys.modules[module_name].__file__))
+        parts = name.split()
+        names.update(' '.join(parts[0:i]) for i in range(1, len(parts) + 1))
+    help = {}
+    for name in names:
+        short_summary = (get_help(name) or {}).get('short-summary')
+        if short_summary:
+            help[name] = short_summary
+    manifest = {'key': _get_manifest_key(), 'modules': modules, 'help': help}
+    try:
+        with open(_get_manifest_path(), 'w') as f:
+            json.dump(manifest, f)
+    except (IOError, OSError):
+        print("Error writing: {}".format(_get_manifest_path()), file=stderr)
+
+
+STATE_VERSION = 1 # Increase when the caches saved by save_state() change their structure or content.
+def _get_state_path():
+    return os.path.join(GLOBAL_CONFIG_DIR, 'azServiceState.json')
+
+
+def _get_state_key():
+    # Caches built by another version of the service are not reused, each extension version has its own directory.
+    return dict(_get_manifest_key(), service=[service_version, os.path.dirname(os.path.abspath(__file__))], state=STATE_VERSION)
+
+
+def save_state(state):
+    """Writes the given caches and the help cache for the next service process, these are only used with the same service, Azure CLI version and extensions."""
+    state = dict(state, key=_get_state_key(), help=dict(HELP_CACHE.items()))
+    path = _get_state_path()
+    temp = '{}.{}'.format(path, os.getpid())
+    try:
+        with open(temp, 'w') as f:
+            json.dump(state, f, default=str)
+        getattr(os, 'replace', os.rename)(temp, path)
+    except (IOError, OSError, TypeError, ValueError):
+        print("Error writing: {}".format(path), file=stderr)
+
+
+def load_state():
+    try:
+        with open(_get_state_path()) as f:
+            state = json.load(f)
+    except (IOError, OSError, ValueError):
+        return None
+    if state.get('key') != _get_state_key():
+        return None
+    for name, help in state.pop('help', {}).items():
+        if name not in HELP_CACHE:
+            HELP_CACHE[name] = help
+    return state
+
+
+EXTENSION_COMMANDS = {}
+def get_installed_extensions():
+    try:
+        from azure.cli.core.extension import EXTENSIONS_DIR
+    except ImportError:
+        return {}
+    if not os.path.isdir(EXTENSIONS_DIR):
+        return {}
+    return {name: os.path.getmtime(os.path.join(EXTENSIONS_DIR, name)) for name in os.listdir(EXTENSIONS_DIR)
+            if os.path.isdir(os.path.join(EXTENSIONS_DIR, name))}
+
+
+def load_extension(cmd_table, extension_name):
+    from azure.cli.core.extension import get_extension_path, get_extension_modname
+
+    ext_dir = get_extension_path(extension_name)
+    if ext_dir not in sys.path:
+        sys.path.append(ext_dir)
+    ext_mod = get_extension_modname(extension_name, ext_dir=ext_dir)
+    extension_command_table = _load_command_module(ext_mod, extension_name)
+    cmd_table.update(extension_command_table)
+    EXTENSION_COMMANDS[extension_name] = list(extension_command_table)
+    return EXTENSION_COMMANDS[extension_name]
+
+
+def unload_extension(cmd_table, extension_name):
+    """Removes the extension's commands, core commands it overrides are loaded again from their module."""
+    commands_loader = cli_ctx.invocation.commands_loader
+    command_names = EXTENSION_COMMANDS.pop(extension_name, [])
+    ext_mods = set()
+    for name in command_names:
+        core_loaders = []
+        for loader in commands_loader.cmd_to_loader_map.pop(name, []):
+            if _is_core_loader(loader):
+                core_loaders.append(loader)
+                continue
+            ext_mods.add(loader.__module__.split('.')[0])
+            if loader in commands_loader.loaders:
+                commands_loader.loaders.remove(loader)
+        commands_loader.command_table.pop(name, None)
+        cmd_table.pop(name, None)
+        ARGUMENTS_LOADED.pop(name, None)
+        ARGUMENTS_CACHE.pop(name)
+        parts = name.split()
+        for i in range(1, len(parts) + 1):
+            HELP_CACHE.pop(' '.join(parts[0:i]), None)
+        if core_loaders:
+            commands_loader.cmd_to_loader_map[name] = core_loaders
+            _restore_core_command(cmd_table, name, core_loaders)
+
+    # Forget the extension's modules so a reinstalled version is imported afresh.
+    for module_name in list(sys.modules):
+        if module_name.split('.')[0] in ext_mods and module_name.startswith('azext'):
+            del sys.modules[module_name]
+    return command_names
+
+
+def _is_core_loader(loader):
+    return loader.__module__.startswith('azure.cli.command_modules.')
+
+
+def _restore_core_command(cmd_table, name, core_loaders):
+    commands_loader = cli_ctx.invocation.commands_loader
+    for loader in core_loaders:
+        try:
+            command = loader.load_command_table(None).get(name)
+        except Exception:  # pylint: disable=broad-except
+            print("Error loading: {}".format(loader.__module__), file=stderr)
+            traceback.print_exc(file=stderr)
+            continue
+        if command is not None:
+            command.command_source = loader.__module__.split('.')[3]
+            commands_loader.command_table[name] = command
+            cmd_table[name] = command
+
+
+def _evict_arguments(command_name, command):
+    command.arguments = {}
+
+
 ARGUMENTS_LOADED = {}
+# Commands with arguments in memory, evicted ones are reloaded on demand.
+ARGUMENTS_CACHE = BudgetedCache('arguments', BUDGET, lambda command: estimate_size(command.arguments), _evict_arguments)
 def get_arguments(command):
-    if not ARGUMENTS_LOADED.get(command.name):
-        ARGUMENTS_LOADED[command.name] = True
-        cli_ctx.invocation.commands_loader.load_arguments(command.name)
+    if ARGUMENTS_CACHE.get(command.name) is None:
+        _load_arguments(command.name)
     return command.arguments
 
 
+def _load_arguments(command_name):
+    ARGUMENTS_LOADED[command_name] = True
+    commands_loader = cli_ctx.invocation.commands_loader
+    commands_loader.load_arguments(command_name)
+    if command_name in commands_loader.command_table:
+        ARGUMENTS_CACHE[command_name] = commands_loader.command_table[command_name]
+
+
 def arguments_loaded(command_name):
     return ARGUMENTS_LOADED.get(command_name, False)
 
 
+def get_loaded_commands(cmd_table):
+    """Names of the commands whose module is imported, all of them unless lazy."""
+    return cmd_table.loaded_names() if isinstance(cmd_table, LazyCommandTable) else list(cmd_table)
+
+
 def load_arguments(cmd_table, batch):
-    for command in cmd_table:
+    # Only commands of already imported modules when lazy.
+    for command in (cmd_table.loaded_names() if isinstance(cmd_table, LazyCommandTable) else cmd_table):
         if not ARGUMENTS_LOADED.get(command):
-            ARGUMENTS_LOADED[command] = True
-            cli_ctx.invocation.commands_loader.load_arguments(command)
+            _load_arguments(command)
             batch = batch - 1
             if batch == 0:
                 return True
     return False
 
 
-HELP_CACHE = {}
+HELP_CACHE = BudgetedCache('help', BUDGET)
 
 
 def get_help(group_or_command):
-    if group_or_command not in HELP_CACHE and group_or_command in helps:
+    help = HELP_CACHE.get(group_or_command)
+    if help is None:
+        help = _load_help(group_or_command)
+        if help is not None:
+            HELP_CACHE[group_or_command] = help
+        elif group_or_command in MANIFEST_HELP:
+            return {'short-summary': MANIFEST_HELP[group_or_command]}  # Module not imported yet.
+    return help
+
+
+def _load_help(group_or_command):
+    from knack.help_files import helps
+    if group_or_command in helps:
+        import yaml
         if before_2_0_64: # FullLoader not present with az 2.0.26.
-            HELP_CACHE[group_or_command] = yaml.load(helps[group_or_command])
-        else:
-            HELP_CACHE[group_or_command] = yaml.load(helps[group_or_command], Loader=yaml.FullLoader)
-    return HELP_CACHE.get(group_or_command)
+            return yaml.load(helps[group_or_command])
+        # libyaml's loader when available, pure Python takes ~0.1 s for the largest help texts.
+        return yaml.load(helps[group_or_command], Loader=getattr(yaml, 'CFullLoader', yaml.FullLoader))
+    return None
+
+
+def get_examples(command_name):
+    """Example texts of the command's help, without adding the help to the cache."""
+    help = HELP_CACHE[command_name] if command_name in HELP_CACHE else _load_help(command_name)
+    return [ example['text'] for example in (help or {}).get('examples') or [] if example.get('text') ]
 
 
 def get_current_subscription():
+    from azure.cli.core._profile import _SUBSCRIPTION_NAME, Profile
+    from azure.cli.core.util import CLIError
     try:
         profile = Profile(cli_ctx=cli_ctx)
         return profile.get_subscription()[_SUBSCRIPTION_NAME]
@@ -113,6 +439,7 @@ def get_current_subscription():
 
 
 def get_configured_defaults():
+    from six.moves import configparser
     config = _reload_config()
     try:
         defaults_section = config.defaults_section_name if hasattr(config, 'defaults_section_name') else 'defaults'
@@ -140,30 +467,59 @@ def is_required(argument):
     return required_tooling and argument.name != 'is_linux'
 
 
-def get_defaults(arguments):
+def get_defaults(arguments, configured_defaults=None):
+    if configured_defaults is not None:
+        # Snapshot from get_configured_defaults(), avoids reloading the config.
+        return {name: configured_defaults.get(getattr(argument.type, 'default_name_tooling', None)) or argument.type.settings.get('default')
+            for name, argument in arguments.items()}
     config = _reload_config()
     return {name: _get_default(config, argument) for name, argument in arguments.items()}
 
 
+def get_config_mtime():
+    try:
+        return os.path.getmtime(GLOBAL_CONFIG_PATH)
+    except OSError:
+        return None
+
+
 def _get_default(config, argument):
     configured = _find_configured_default(config, argument)
     # TODO: Some default values are built-in (not configured as we want here), but we don't know which.
     return configured or argument.type.settings.get('default')
 
 
-def run_argument_value_completer(command, argument, cli_arguments):
+def run_argument_value_completer(command, argument, cli_arguments, prefix=''):
+    return prepare_argument_value_completer(command, argument, cli_arguments, prefix)()
+
+
+def prepare_argument_value_completer(command, argument, cli_arguments, prefix=''):
+    """Resolves the completer's arguments and defaults now, the returned function can run later on another thread."""
     try:
         args = _to_argument_object(command, cli_arguments)
         _add_defaults(command, args)
-        return argument.completer(prefix='', action=None, parsed_args=args)
     except TypeError:
+        args = None
+
+    def run():
+        if args is not None:
+            try:
+                return argument.completer(prefix=prefix, action=None, parsed_args=args)
+            except TypeError:
+                pass
         try:
-            return argument.completer(prefix='')
+            return argument.completer(prefix=prefix)
         except TypeError:
             try:
                 return argument.completer()
             except TypeError:
                 return None
+    return run
+
+
+def get_completer_name(argument):
+    completer = getattr(argument.completer, 'func', argument.completer)
+    return getattr(completer, '__qualname__', None) or getattr(completer, '__name__', type(completer).__name__)
 
 
 def _to_argument_object(command, cli_arguments):
@@ -198,10 +554,12 @@ def _reload_config():
         cli_ctx.config.config_parser.read(GLOBAL_CONFIG_PATH)
         return cli_ctx.config
     else:
+        from knack.config import CLIConfig
         return CLIConfig(config_dir=GLOBAL_CONFIG_DIR, config_env_var_prefix=ENV_VAR_PREFIX)
 
 
 def _find_configured_default(config, argument):
+    from six.moves import configparser
     if not (hasattr(argument.type, 'default_name_tooling') and argument.type.default_name_tooling):
         return None
     try:
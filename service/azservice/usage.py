@@ -0,0 +1,106 @@
+"""argument usage index"""
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+import sys
+from array import array
+
+from azservice.azcli import get_invocations, parse_invocation
+
+MAX_ID = 0xFFFF # Option ids are stored as unsigned shorts, 0 ends an example.
+
+
+class UsageIndex(object):
+    """Which options the help examples of each command use together.
+
+    Options are coded as integers shared by all commands, the examples of a command are kept
+    in a single array of these ids with 0 after each example."""
+
+    def __init__(self):
+        self._ids = {} # option -> id
+        self._names = [None] # id -> option
+        self._examples = {} # command name -> array('H')
+        self._pending = []
+        self._scheduled = set()
+
+    def schedule(self, command_names):
+        """Queues commands to be indexed by take_pending()."""
+        command_names = list(command_names)
+        self._scheduled.update(command_names)
+        self._pending.extend(command_names)
+
+    def schedule_new(self, command_names):
+        """Queues the commands not scheduled before, e.g., those of command modules imported since."""
+        self.schedule([ name for name in command_names if name not in self._scheduled ])
+
+    def take_pending(self, count):
+        taken = self._pending[-count:]
+        del self._pending[-count:]
+        return taken
+
+    def has_pending(self):
+        return bool(self._pending)
+
+    def add(self, command_name, examples):
+        """Indexes the options of each example, given as sets."""
+        codes = array('H')
+        for names in examples:
+            ids = sorted(set(self._get_id(name) for name in names) - set([None]))
+            if ids:
+                codes.extend(ids)
+                codes.append(0)
+        if codes:
+            self._examples[command_name] = codes
+        else:
+            self._examples.pop(command_name, None)
+
+    def remove(self, command_names):
+        for command_name in command_names:
+            self._examples.pop(command_name, None)
+            self._scheduled.discard(command_name)
+
+    def get_scores(self, command_name, used_names):
+        """Scores the options not in `used_names` by how often they appear in the command's examples,
+        each example counting more for every option of `used_names` it also uses."""
+        codes = self._examples.get(command_name)
+        if not codes:
+            return {}
+        used = set(self._ids[name] for name in used_names if name in self._ids)
+        scores = {}
+        example = []
+        for code in codes:
+            if code:
+                example.append(code)
+                continue
+            weight = 1 + len(used.intersection(example))
+            for argument in example:
+                if argument not in used:
+                    scores[argument] = scores.get(argument, 0) + weight
+            example = []
+        return { self._names[argument]: score for argument, score in scores.items() }
+
+    def get_stats(self):
+        return {
+            'commands': len(self._examples),
+            'examples': sum(codes.count(0) for codes in self._examples.values()),
+            'options': len(self._names) - 1,
+            'pending': len(self._pending),
+            'bytes': sum(sys.getsizeof(codes) for codes in self._examples.values())
+        }
+
+    def _get_id(self, name):
+        code = self._ids.get(name)
+        if code is None and len(self._names) <= MAX_ID:
+            code = self._ids[name] = len(self._names)
+            self._names.append(name)
+        return code
+
+
+def get_example_options(command_name, examples, command_table):
+    """Yields the options used by each invocation of the command in the example texts."""
+    for text in examples:
+        for invocation in get_invocations(text):
+            parsed = parse_invocation(invocation.tokens, command_table)
+            if parsed.command_name == command_name:
+                yield set(option for option, _ in parsed.arguments)
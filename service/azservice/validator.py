@@ -0,0 +1,203 @@
+"""batch validation of .azcli scripts"""
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+from __future__ import print_function
+
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from azservice.azcli import get_invocations, parse_invocation, unquote, is_dynamic
+from azservice.tooling import GLOBAL_ARGUMENTS, initialize, load_command_table, get_arguments, get_defaults, is_required, get_options
+
+SCRIPT_EXTENSION = '.azcli'
+HELP_OPTIONS = ['--help', '-h']
+ROOT_OPTIONS = ['--version']
+IDS_OPTION = '--ids'
+CONFIGURE_COMMAND = 'configure'
+DEFAULTS_OPTIONS = ['--defaults', '-d']
+
+# Loaded once before the worker processes are forked.
+COMMAND_TABLE = {}
+GROUPS = set()
+DEFAULTS = {}
+GLOBAL_OPTIONS = set(option for argument in GLOBAL_ARGUMENTS.values() for option in argument['options'])
+
+
+def load(files):
+    global COMMAND_TABLE
+    initialize()
+    COMMAND_TABLE = load_command_table()
+    for command_name in COMMAND_TABLE:
+        parts = command_name.split()
+        GROUPS.update(' '.join(parts[0:i]) for i in range(1, len(parts)))
+
+    # Arguments and defaults only of the commands used, the workers share them after the fork.
+    for command_name in get_used_commands(files):
+        DEFAULTS[command_name] = get_defaults(get_arguments(COMMAND_TABLE[command_name]))
+
+
+def get_used_commands(files):
+    used = set()
+    for path in files:
+        text = read_script(path)
+        if text is not None:
+            for invocation in get_invocations(text):
+                command_name = parse_invocation(invocation.tokens, COMMAND_TABLE).command_name
+                if command_name:
+                    used.add(command_name)
+    return used
+
+
+def find_scripts(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.endswith(SCRIPT_EXTENSION):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def read_script(path):
+    try:
+        with io.open(path, encoding='utf-8', errors='replace') as f:
+            return f.read()
+    except (IOError, OSError):
+        return None
+
+
+def validate_file(path):
+    text = read_script(path)
+    if text is None:
+        return { 'file': path, 'error': 'File not readable' }
+    diagnostics = []
+    commands = 0
+    script_defaults = set()
+    for invocation in get_invocations(text):
+        commands += 1
+        diagnostics.extend(validate_invocation(invocation, script_defaults))
+    return { 'file': path, 'commands': commands, 'diagnostics': diagnostics }
+
+
+def validate_invocation(invocation, script_defaults=None):
+    script_defaults = set() if script_defaults is None else script_defaults
+    parsed = parse_invocation(invocation.tokens, COMMAND_TABLE)
+    options = [ option for option, _ in parsed.arguments ]
+    if parsed.command_name == CONFIGURE_COMMAND:
+        script_defaults.update(get_configured_names(parsed))
+    if not parsed.command_name:
+        name = ' '.join(parsed.words)
+        if not name and all(option in GLOBAL_OPTIONS or option in ROOT_OPTIONS for option in options):
+            return []
+        if name in GROUPS:
+            if set(options) & set(HELP_OPTIONS):
+                return []
+            return [ diagnostic(invocation, name, 'unknown-command', "'{}' is a command group, not a command".format(name)) ]
+        return [ diagnostic(invocation, name, 'unknown-command', "'{}' is not a command".format(name)) ]
+
+    command_name = parsed.command_name
+    arguments = get_arguments(COMMAND_TABLE[command_name])
+    by_option = { option: (name, argument) for name, argument in arguments.items() for option in get_options(argument.options_list) }
+    has_ids = any(argument.type.settings.get('id_part') for argument in arguments.values())
+    diagnostics = []
+    if parsed.words and all(get_options(argument.options_list) for argument in arguments.values()):
+        diagnostics.append(diagnostic(invocation, command_name, 'unknown-argument', 'Unrecognized arguments: {}'.format(' '.join(parsed.words))))
+
+    used = set()
+    for option, values in parsed.arguments:
+        if option in by_option:
+            name, argument = by_option[option]
+            used.add(name)
+            if argument.choices:
+                choices = [ str(choice).lower() for choice in argument.choices ]
+                for value in values:
+                    if not is_dynamic(value) and unquote(value).lower() not in choices:
+                        diagnostics.append(diagnostic(invocation, command_name, 'invalid-choice', "Invalid value '{}' for {}, allowed values: {}".format(
+                            unquote(value), option, ', '.join(str(choice) for choice in argument.choices))))
+        elif option not in GLOBAL_OPTIONS and not (option == IDS_OPTION and has_ids):
+            diagnostics.append(diagnostic(invocation, command_name, 'unknown-argument', 'Unrecognized argument: {}'.format(option)))
+
+    if not set(options) & set(HELP_OPTIONS):
+        defaults = DEFAULTS.get(command_name)
+        if defaults is None:
+            defaults = DEFAULTS[command_name] = get_defaults(arguments)
+        uses_ids = IDS_OPTION in options # Replaces the arguments identifying the resource.
+        for name, argument in arguments.items():
+            if is_mandatory(argument) and name not in used and not defaults.get(name) \
+                    and getattr(argument.type, 'default_name_tooling', None) not in script_defaults \
+                    and not (uses_ids and argument.type.settings.get('id_part')):
+                diagnostics.append(diagnostic(invocation, command_name, 'missing-argument', 'Missing required argument: {}'.format(
+                    ' | '.join(get_options(argument.options_list)))))
+    return diagnostics
+
+
+def is_mandatory(argument):
+    # The tooling flag is also set on some arguments the parser does not require (e.g., --cmd).
+    return is_required(argument) and argument.type.settings.get('required') is not False \
+        and argument.type.settings.get('help') != '==SUPPRESS=='
+
+
+def get_configured_names(parsed):
+    """Config keys set by 'az configure --defaults key=value', these apply to the rest of the script."""
+    return [ unquote(value).split('=', 1)[0] for option, values in parsed.arguments if option in DEFAULTS_OPTIONS for value in values if '=' in unquote(value) ]
+
+
+def diagnostic(invocation, command_name, code, message):
+    return {
+        'line': invocation.line,
+        'command': ('az ' + command_name).strip(),
+        'code': code,
+        'message': message
+    }
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog='validate', description='Validates the az commands in .azcli scripts against the installed Azure CLI.')
+    parser.add_argument('paths', nargs='+', help='Scripts or directories to search for {} scripts.'.format(SCRIPT_EXTENSION))
+    parser.add_argument('--jobs', type=int, default=multiprocessing.cpu_count(), help='Number of worker processes.')
+    args = parser.parse_args(args)
+
+    start = time.time()
+    files = list(find_scripts(args.paths))
+    load(files)
+    loaded = time.time()
+
+    # Workers are forked to share the loaded command table, other platforms validate in this process.
+    pool = None
+    if args.jobs > 1 and len(files) > 1 and 'fork' in multiprocessing.get_all_start_methods():
+        pool = multiprocessing.get_context('fork').Pool(args.jobs)
+        results = pool.imap_unordered(validate_file, files, chunksize=4)
+    else:
+        results = (validate_file(path) for path in files)
+
+    summary = { 'files': 0, 'commands': 0, 'diagnostics': 0, 'errors': 0 }
+    try:
+        for result in results:
+            summary['files'] += 1
+            summary['commands'] += result.get('commands', 0)
+            summary['diagnostics'] += len(result.get('diagnostics', []))
+            summary['errors'] += 1 if 'error' in result else 0
+            print(json.dumps(result))
+            sys.stdout.flush()
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+
+    summary['load_seconds'] = round(loaded - start, 3)
+    summary['validate_seconds'] = round(time.time() - loaded, 3)
+    print(json.dumps({ 'summary': summary }))
+    return 1 if summary['diagnostics'] or summary['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""argument value completion latency benchmark"""
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks import mockarm
+from benchmarks.startup import SERVICE_DIR, median
+
+SCENARIOS = {
+    'groups': {'subcommand': 'group show', 'argument': '--name', 'arguments': {}},
+    'locations': {'subcommand': 'group create', 'argument': '--location', 'arguments': {}},
+    'webapps': {'subcommand': 'webapp browse', 'argument': '--name', 'arguments': {'--resource-group': 'rg-00000'}},
+    'storage': {'subcommand': 'storage account show', 'argument': '--name', 'arguments': {'--resource-group': 'rg-00000'}},
+}
+MODES = ['direct', 'burst', 'prefetched'] # Prefetched last, its cached results would answer the other modes.
+
+
+class Service(object):
+    """az-service process talking the stdin/stdout protocol."""
+
+    def __init__(self, python, env):
+        env = dict(os.environ, **env)
+        env['PYTHONPATH'] = SERVICE_DIR + os.pathsep + env.get('PYTHONPATH', '')
+        self.process = subprocess.Popen([python, '-m', 'azservice'], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=subprocess.DEVNULL, env=env, universal_newlines=True)
+        self.sequence = 0
+
+    def send(self, data):
+        self.sequence += 1
+        self.process.stdin.write(json.dumps({'sequence': self.sequence, 'data': data}) + '\n')
+        self.process.stdin.flush()
+        return self.sequence
+
+    def receive(self):
+        line = self.process.stdout.readline()
+        if not line:
+            raise RuntimeError('az-service exited (exit code {})'.format(self.process.wait()))
+        response = json.loads(line)
+        while response.get('more'):
+            response = json.loads(self.process.stdout.readline())
+        return response
+
+    def request(self, data):
+        start = time.time()
+        self.send(data)
+        response = self.receive()
+        return response['data'], time.time() - start
+
+    def wait_for_prefetch(self, timeout=60):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            prefetch = self.request({'request': 'diagnostics'})[0]['prefetch']
+            if not prefetch['pending'] and not prefetch['running']:
+                return
+            time.sleep(0.05)
+
+    def close(self):
+        self.process.kill()
+        self.process.wait()
+
+
+def value_query(scenario, limit, prefix):
+    query = dict(SCENARIOS[scenario])
+    if limit:
+        query['limit'] = limit
+    if prefix:
+        query['prefix'] = prefix
+    return query
+
+
+def measure(service, scenario, mode, args):
+    query = value_query(scenario, args.limit, args.prefix)
+    if mode == 'prefetched':
+        # Argument name completion of the same command, then value completion after the prefetch finished.
+        service.request({'subcommand': query['subcommand'], 'arguments': query['arguments']})
+        service.wait_for_prefetch()
+    if mode == 'burst':
+        start = time.time()
+        for _ in range(args.burst):
+            service.send(query)
+        for _ in range(args.burst):
+            data = service.receive()['data']
+        return data, time.time() - start
+    return service.request(query)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measures argument value completion latency against a local stand-in for Azure Resource Manager.')
+    parser.add_argument('--python', default=sys.executable, help='Python interpreter of the Azure CLI.')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), action='append', help='Completer scenarios to run (default: all).')
+    parser.add_argument('--mode', choices=MODES, action='append', help='direct: value completion only, burst: identical value completions sent at once, prefetched: after the argument name completion has been prefetched (default: all).')
+    parser.add_argument('--burst', type=int, default=5, help='Number of identical requests in burst mode.')
+    parser.add_argument('--limit', type=int, default=200, help='Result limit sent with the value completions (0 for none).')
+    parser.add_argument('--prefix', default='', help='Typed prefix sent with the value completions.')
+    mockarm.add_arguments(parser)
+    parser.add_argument('--baseline', help='JSON file with a previous result, fails if a median regressed beyond the tolerance.')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed relative regression against the baseline.')
+    parser.add_argument('--save', help='Writes the result to this JSON file, to be used as baseline later.')
+    args = parser.parse_args()
+
+    mock = mockarm.from_arguments(args).start()
+    try:
+        service = Service(args.python, mock.get_environment())
+    except Exception:
+        mock.stop()
+        raise
+    results = []
+    try:
+        service.request({'request': 'status'})
+        for scenario in args.scenario or sorted(SCENARIOS):
+            for mode in [ mode for mode in MODES if not args.mode or mode in args.mode ]:
+                timings = []
+                for run in range(args.runs):
+                    before = dict(mock.stats)
+                    data, seconds = measure(service, scenario, mode, args)
+                    timings.append(seconds)
+                    print(json.dumps({'scenario': scenario, 'mode': mode, 'run': run, 'seconds': round(seconds, 3), 'values': len(data),
+                                      'arm_requests': mock.stats['requests'] - before['requests'], 'arm_failures': mock.stats['failures'] - before['failures']}))
+                    sys.stdout.flush()
+                results.append({'scenario': scenario, 'mode': mode, 'runs': args.runs, 'median': round(median(timings), 3),
+                                'min': round(min(timings), 3), 'max': round(max(timings), 3)})
+                print(json.dumps(results[-1]))
+                sys.stdout.flush()
+        diagnostics = service.request({'request': 'diagnostics'})[0]
+        print(json.dumps({'arm': mock.stats, 'prefetch': diagnostics['prefetch'], 'requests': diagnostics['requests']}))
+    finally:
+        service.close()
+        mock.stop()
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = dict(((result['scenario'], result['mode']), result) for result in json.load(f))
+        regressed = False
+        for result in results:
+            previous = baseline.get((result['scenario'], result['mode']))
+            if previous:
+                limit = previous['median'] * (1 + args.tolerance)
+                if result['median'] > limit:
+                    print('Regression: {} {} median {} s exceeds {} s (baseline {} s)'.format(
+                        result['scenario'], result['mode'], result['median'], round(limit, 3), previous['median']), file=sys.stderr)
+                    regressed = True
+        if regressed:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,329 @@
+"""local stand-in for Azure Resource Manager"""
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+from __future__ import print_function
+
+import argparse
+import datetime
+import json
+import os
+import random
+import re
+import shutil
+import ssl
+import sys
+import tempfile
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import urlparse, parse_qs, urlencode
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import urlparse, parse_qs
+    from urllib import urlencode
+
+SUBSCRIPTION_ID = '00000000-0000-0000-0000-00000000a2c1'
+TENANT_ID = '00000000-0000-0000-0000-00000000a2c2'
+CLOUD_NAME = 'MockArmCloud'
+IDENTITY_HEADER = 'mock-arm-identity'
+TOKEN_PATH = '/msi/token'
+PAGE_SIZE = 1000
+LOCATIONS = ['eastus', 'eastus2', 'westus', 'westus2', 'centralus', 'northeurope', 'westeurope', 'uksouth', 'japaneast', 'australiaeast']
+RESOURCE_TYPES = {
+    'microsoft.web/sites': ('Microsoft.Web/sites', 'app-{}-{}'),
+    'microsoft.storage/storageaccounts': ('Microsoft.Storage/storageAccounts', 'st{}x{}'),
+}
+
+SUBSCRIPTION = '/subscriptions/' + SUBSCRIPTION_ID
+ROUTES = [
+    (re.compile(r'^/subscriptions/[^/]+/locations$', re.I), 'locations'),
+    (re.compile(r'^/subscriptions/[^/]+/resourcegroups$', re.I), 'groups'),
+    (re.compile(r'^/subscriptions/[^/]+/resourcegroups/([^/]+)$', re.I), 'group'),
+    (re.compile(r'^/subscriptions/[^/]+/resourcegroups/([^/]+)/resources$', re.I), 'resources'),
+    (re.compile(r'^/subscriptions/[^/]+/resources$', re.I), 'resources'),
+]
+RESOURCE_TYPE_FILTER = re.compile(r"resourceType eq '([^']+)'", re.I)
+RESOURCE_GROUP_FILTER = re.compile(r"resourceGroup eq '([^']+)'", re.I)
+
+
+class MockArm(object):
+    """Serves the ARM endpoints used by common completers (locations, resource groups, web apps, storage accounts)
+    and a managed identity token endpoint over HTTPS, with configurable latency, failure rate and result counts."""
+
+    def __init__(self, groups=100, resources=5, latency=0.0, jitter=0.0, failure_rate=0.0, seed=0, port=0):
+        self.groups = groups
+        self.resources = resources
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.port = port
+        self.url = None
+        self.directory = None
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+        self.stats = {'requests': 0, 'failures': 0, 'tokens': 0}
+
+    def start(self):
+        self.directory = tempfile.mkdtemp(prefix='mockarm-')
+        certfile, keyfile = create_certificate(self.directory)
+        self._server = ThreadingHTTPServer(('127.0.0.1', self.port), MockArmHandler)
+        self._server.mock = self
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(certfile, keyfile)
+        self._server.socket = context.wrap_socket(self._server.socket, server_side=True)
+        self.url = 'https://127.0.0.1:{}'.format(self._server.server_address[1])
+        thread = threading.Thread(target=self._server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self.directory:
+            # Holds the private key, the CA bundle and the Azure CLI config.
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self.directory = None
+
+    def get_environment(self):
+        """Environment variables making the Azure CLI use this server, logged in with a managed identity."""
+        config_dir = os.path.join(self.directory, 'azure')
+        write_config(config_dir, self.url)
+        return {
+            'AZURE_CONFIG_DIR': config_dir,
+            'IDENTITY_ENDPOINT': self.url + TOKEN_PATH,
+            'IDENTITY_HEADER': IDENTITY_HEADER,
+            'REQUESTS_CA_BUNDLE': os.path.join(self.directory, 'cert.pem'),
+            'AZURE_CORE_COLLECT_TELEMETRY': 'false',
+            'AZURE_CORE_NO_COLOR': 'true',
+        }
+
+    def get_group_names(self):
+        return ['rg-{:05d}'.format(i) for i in range(self.groups)]
+
+    def list_locations(self):
+        return [{
+            'id': '{}/locations/{}'.format(SUBSCRIPTION, name),
+            'name': name,
+            'displayName': name,
+            'regionalDisplayName': name,
+            'metadata': {'regionType': 'Physical', 'regionCategory': 'Recommended'}
+        } for name in LOCATIONS]
+
+    def list_groups(self):
+        return [{
+            'id': '{}/resourceGroups/{}'.format(SUBSCRIPTION, name),
+            'name': name,
+            'type': 'Microsoft.Resources/resourceGroups',
+            'location': LOCATIONS[i % len(LOCATIONS)],
+            'properties': {'provisioningState': 'Succeeded'}
+        } for i, name in enumerate(self.get_group_names())]
+
+    def list_resources(self, group=None, resource_type=None):
+        indexes = range(self.groups)
+        if group is not None:
+            names = [name.lower() for name in self.get_group_names()]
+            indexes = [names.index(group.lower())] if group.lower() in names else []
+        types = [RESOURCE_TYPES[resource_type.lower()]] if resource_type and resource_type.lower() in RESOURCE_TYPES else \
+            [] if resource_type else list(RESOURCE_TYPES.values())
+        return [{
+            'id': '{}/resourceGroups/rg-{:05d}/providers/{}/{}'.format(SUBSCRIPTION, i, type_name, name_pattern.format(i, j)),
+            'name': name_pattern.format(i, j),
+            'type': type_name,
+            'location': LOCATIONS[i % len(LOCATIONS)]
+        } for i in indexes for type_name, name_pattern in types for j in range(self.resources)]
+
+    def should_fail(self):
+        with self._lock:
+            self.stats['requests'] += 1
+            fail = self._random.random() < self.failure_rate
+            if fail:
+                self.stats['failures'] += 1
+            delay = self.latency + self._random.uniform(0, self.jitter)
+        time.sleep(delay)
+        return fail
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class MockArmHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        mock = self.server.mock
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path == TOKEN_PATH:
+            return self._token(mock, query)
+        route = next(((kind, match) for pattern, kind in ROUTES for match in [pattern.match(url.path)] if match), None)
+        if not route:
+            return self._error(404, 'NotFound', 'No mock for {}'.format(url.path))
+        if mock.should_fail():
+            return self._error(500, 'InternalServerError', 'Injected failure.')
+        kind, match = route
+        if kind == 'locations':
+            items = mock.list_locations()
+        elif kind == 'groups':
+            items = mock.list_groups()
+        elif kind == 'group':
+            group = next((group for group in mock.list_groups() if group['name'].lower() == match.group(1).lower()), None)
+            if not group:
+                return self._error(404, 'ResourceGroupNotFound', "Resource group '{}' could not be found.".format(match.group(1)))
+            return self._json(200, group)
+        else:
+            filters = query.get('$filter', [''])[0]
+            group = match.group(1) if match.groups() else next(iter(RESOURCE_GROUP_FILTER.findall(filters)), None)
+            resource_type = next(iter(RESOURCE_TYPE_FILTER.findall(filters)), None)
+            items = mock.list_resources(group, resource_type)
+        self._page(url, query, items)
+
+    def _token(self, mock, query):
+        if self.headers.get('X-IDENTITY-HEADER') != IDENTITY_HEADER:
+            return self._error(401, 'Unauthorized', 'Missing identity header.')
+        with mock._lock:
+            mock.stats['tokens'] += 1
+        self._json(200, {
+            'access_token': 'mock-arm-token',
+            'expires_on': str(int(time.time()) + 3600),
+            'resource': query.get('resource', [''])[0],
+            'token_type': 'Bearer',
+            'client_id': '00000000-0000-0000-0000-00000000a2c3'
+        })
+
+    def _page(self, url, query, items):
+        skip = int(query.get('$skiptoken', ['0'])[0])
+        result = {'value': items[skip:skip + PAGE_SIZE]}
+        if skip + PAGE_SIZE < len(items):
+            next_query = dict((key, values[0]) for key, values in query.items())
+            next_query['$skiptoken'] = str(skip + PAGE_SIZE)
+            result['nextLink'] = '{}{}?{}'.format(self.server.mock.url, url.path, urlencode(next_query))
+        self._json(200, result)
+
+    def _error(self, status, code, message):
+        self._json(status, {'error': {'code': code, 'message': message}})
+
+    def _json(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args): # pylint: disable=redefined-builtin
+        pass
+
+
+def create_certificate(directory):
+    """Self-signed certificate for 127.0.0.1, using the cryptography package the Azure CLI depends on."""
+    import ipaddress
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.x509.oid import NameOID
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, u'127.0.0.1')])
+    now = datetime.datetime.utcnow()
+    certificate = x509.CertificateBuilder() \
+        .subject_name(name) \
+        .issuer_name(name) \
+        .public_key(key.public_key()) \
+        .serial_number(x509.random_serial_number()) \
+        .not_valid_before(now - datetime.timedelta(days=1)) \
+        .not_valid_after(now + datetime.timedelta(days=7)) \
+        .add_extension(x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address(u'127.0.0.1')), x509.DNSName(u'localhost')]), critical=False) \
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True) \
+        .sign(key, hashes.SHA256())
+    certfile = os.path.join(directory, 'cert.pem')
+    keyfile = os.path.join(directory, 'key.pem')
+    with open(certfile, 'wb') as f:
+        f.write(certificate.public_bytes(serialization.Encoding.PEM))
+    with open(keyfile, 'wb') as f:
+        f.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.TraditionalOpenSSL, serialization.NoEncryption()))
+    return certfile, keyfile
+
+
+def write_config(config_dir, url):
+    """Azure CLI config directory with a cloud pointing to the mock and a managed identity account."""
+    if not os.path.isdir(config_dir):
+        os.makedirs(config_dir)
+    with open(os.path.join(config_dir, 'clouds.config'), 'w') as f:
+        f.write('\n'.join([
+            '[{}]'.format(CLOUD_NAME),
+            'endpoint_resource_manager = {}/'.format(url),
+            'endpoint_management = {}/'.format(url),
+            'endpoint_active_directory = {}'.format(url),
+            'endpoint_active_directory_resource_id = https://management.core.windows.net/',
+            'endpoint_active_directory_graph_resource_id = https://graph.windows.net/',
+            'endpoint_gallery = {}/'.format(url),
+            'endpoint_sql_management = {}/'.format(url),
+            'suffix_storage_endpoint = core.windows.net',
+            'profile = latest',
+            ''
+        ]))
+    with open(os.path.join(config_dir, 'config'), 'w') as f:
+        f.write('[cloud]\nname = {}\n\n[core]\ncollect_telemetry = false\nfirst_run = false\n'.format(CLOUD_NAME))
+    with open(os.path.join(config_dir, 'azureProfile.json'), 'w') as f:
+        json.dump({
+            'installationId': '00000000-0000-0000-0000-00000000a2c4',
+            'subscriptions': [{
+                'id': SUBSCRIPTION_ID,
+                'name': 'Mock ARM Subscription',
+                'state': 'Enabled',
+                'user': {'name': 'systemAssignedIdentity', 'type': 'servicePrincipal', 'assignedIdentityInfo': 'MSI'},
+                'isDefault': True,
+                'tenantId': TENANT_ID,
+                'environmentName': CLOUD_NAME,
+                'homeTenantId': TENANT_ID,
+                'managedByTenants': []
+            }]
+        }, f)
+
+
+def add_arguments(parser):
+    parser.add_argument('--groups', type=int, default=100, help='Number of resource groups.')
+    parser.add_argument('--resources', type=int, default=5, help='Number of web apps and of storage accounts per resource group.')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to each ARM response.')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Random seconds up to this value added to the latency.')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='Fraction of ARM requests answered with an error.')
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def from_arguments(args, port=0):
+    return MockArm(groups=args.groups, resources=args.resources, latency=args.latency, jitter=args.jitter,
+                   failure_rate=args.failure_rate, seed=args.seed, port=port)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Runs a local stand-in for Azure Resource Manager and prints the environment to use it with.')
+    parser.add_argument('--port', type=int, default=0)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    mock = from_arguments(args, args.port).start()
+    for name, value in sorted(mock.get_environment().items()):
+        print('export {}={}'.format(name, value))
+    sys.stdout.flush()
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        mock.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""time to first response benchmark"""
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FIRST_REQUESTS = {
+    'status': {'request': 'status'},
+    'root': {},
+    'group': {'subcommand': 'webapp'},
+}
+
+
+def measure_first_response(python, data, extra_args=()):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = SERVICE_DIR + os.pathsep + env.get('PYTHONPATH', '')
+    start = time.time()
+    process = subprocess.Popen([python, '-m', 'azservice'] + list(extra_args), stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                               stderr=subprocess.DEVNULL, env=env, universal_newlines=True)
+    try:
+        process.stdin.write(json.dumps({'sequence': 1, 'data': data}) + '\n')
+        process.stdin.flush()
+        response = process.stdout.readline()
+        elapsed = time.time() - start
+        if not response:
+            raise RuntimeError('az-service exited without response (exit code {})'.format(process.wait()))
+        return elapsed
+    finally:
+        process.kill()
+        process.wait()
+
+
+def median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measures the time from starting az-service to its first response.')
+    parser.add_argument('--python', default=sys.executable, help='Python interpreter of the Azure CLI.')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--request', choices=sorted(FIRST_REQUESTS), default='status')
+    parser.add_argument('--baseline', help='JSON file with a previous result, fails if the median regressed beyond the tolerance.')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed relative regression against the baseline.')
+    parser.add_argument('--save', help='Writes the result to this JSON file, to be used as baseline later.')
+    args = parser.parse_args()
+
+    timings = []
+    for run in range(args.runs):
+        timings.append(measure_first_response(args.python, FIRST_REQUESTS[args.request]))
+        print(json.dumps({'run': run, 'request': args.request, 'seconds': round(timings[-1], 3)}))
+        sys.stdout.flush()
+
+    result = {'request': args.request, 'runs': args.runs, 'median': round(median(timings), 3),
+              'min': round(min(timings), 3), 'max': round(max(timings), 3)}
+    print(json.dumps(result))
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(result, f)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        limit = baseline['median'] * (1 + args.tolerance)
+        if result['median'] > limit:
+            print('Regression: median {} s exceeds {} s (baseline {} s)'.format(result['median'], round(limit, 3), baseline['median']), file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,51 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+# pylint: skip-file
+import unittest
+
+from azservice.azcli import get_invocations, parse_invocation, is_dynamic
+
+COMMAND_TABLE = { 'group create': None, 'webapp create': None, 'webapp': None }
+
+
+class AzCliTest(unittest.TestCase):
+
+    def test_invocations(self):
+        script = '\n'.join([
+            '# az comment',
+            'az group create -n "a b" \\',
+            '  -l westus',
+            'echo az nope; az webapp create -n x && az group create',
+            'id=$(az group show -n g --query id -o tsv)',
+        ])
+        invocations = [ (invocation.line, invocation.tokens) for invocation in get_invocations(script) ]
+        self.assertEqual(invocations, [
+            (2, ['group', 'create', '-n', '"a b"', '-l', 'westus']),
+            (4, ['webapp', 'create', '-n', 'x']),
+            (4, ['group', 'create']),
+            (5, ['group', 'show', '-n', 'g', '--query', 'id', '-o', 'tsv']),
+        ])
+
+    def test_parse_invocation(self):
+        parsed = parse_invocation(['webapp', 'create', 'extra', '--name=x', '--tags', 'a=b', 'c=d', '--offset', '-1'], COMMAND_TABLE)
+        self.assertEqual(parsed.command_name, 'webapp create')
+        self.assertEqual(parsed.words, ['extra'])
+        self.assertEqual(parsed.arguments, [('--name', ['x']), ('--tags', ['a=b', 'c=d']), ('--offset', ['-1'])])
+
+        parsed = parse_invocation(['webapp', 'frobnicate'], COMMAND_TABLE)
+        self.assertEqual(parsed.command_name, 'webapp')
+        self.assertEqual(parsed.words, ['frobnicate'])
+
+    def test_dynamic_values(self):
+        self.assertTrue(is_dynamic('$NAME'))
+        self.assertTrue(is_dynamic('"${NAME}-web"'))
+        self.assertTrue(is_dynamic('`date`'))
+        self.assertFalse(is_dynamic("'$literal'"))
+        self.assertFalse(is_dynamic('westus'))
+
+
+if __name__ == '__main__':
+    unittest.main()
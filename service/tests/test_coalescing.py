@@ -0,0 +1,65 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+# pylint: skip-file
+import json
+import unittest
+try:
+    from Queue import Queue
+except ImportError:
+    from queue import Queue
+
+from azservice.coalescing import get_request_key, take_duplicates
+
+QUERY = { 'subcommand': 'group show', 'argument': '--name', 'arguments': {} }
+
+
+def line(sequence, data):
+    return json.dumps({ 'sequence': sequence, 'data': data })
+
+
+def queue_of(lines):
+    queue = Queue()
+    for item in lines:
+        queue.put(item)
+    return queue
+
+
+class CoalescingTest(unittest.TestCase):
+
+    def test_request_key(self):
+        self.assertEqual(get_request_key({ 'a': 1, 'b': { 'c': 2, 'd': 3 } }), get_request_key({ 'b': { 'd': 3, 'c': 2 }, 'a': 1 }))
+        self.assertNotEqual(get_request_key(QUERY), get_request_key(dict(QUERY, prefix='rg')))
+
+    def test_duplicates_taken_others_kept_in_order(self):
+        other = { 'request': 'status' }
+        changed = ('extensions_changed', ['ext'], [])
+        queue = queue_of([line(2, QUERY), line(3, other), changed, 'not json', line(4, dict(QUERY)), line(5, dict(QUERY, prefix='rg'))])
+        backlog = []
+        self.assertEqual([2, 4], take_duplicates(queue, backlog, get_request_key(QUERY)))
+        self.assertEqual([line(3, other), changed, 'not json', line(5, dict(QUERY, prefix='rg'))], backlog)
+        self.assertTrue(queue.empty())
+
+    def test_backlog_searched_before_queue(self):
+        backlog = [line(2, { 'request': 'status' }), line(3, QUERY)]
+        queue = queue_of([line(4, QUERY)])
+        self.assertEqual([3, 4], take_duplicates(queue, backlog, get_request_key(QUERY)))
+        self.assertEqual([line(2, { 'request': 'status' })], backlog)
+
+    def test_arriving_while_computing(self):
+        queue = queue_of([line(2, QUERY)])
+        backlog = []
+        key = get_request_key(QUERY)
+        self.assertEqual([2], take_duplicates(queue, backlog, key))
+        # Queued while the first result is computed.
+        queue.put(line(3, { 'request': 'hover', 'command': { 'subcommand': 'group' } }))
+        queue.put(line(4, QUERY))
+        self.assertEqual([4], take_duplicates(queue, backlog, key))
+        self.assertEqual([line(3, { 'request': 'hover', 'command': { 'subcommand': 'group' } })], backlog)
+        self.assertEqual([], take_duplicates(queue, backlog, key))
+
+
+if __name__ == '__main__':
+    unittest.main()
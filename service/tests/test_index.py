@@ -0,0 +1,42 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+# pylint: skip-file
+import unittest
+
+from azservice.index import get_group_index, add_to_group_index, remove_from_group_index, get_snippets, add_snippets, remove_snippets
+
+CORE_COMMANDS = ['fake group create', 'fake group delete']
+EXTENSION_COMMANDS = ['fake group create', 'fake extra show']
+
+
+def get_details(index, key):
+    return sorted(completion['detail'] for completion in index.get(key, []))
+
+
+class IndexTest(unittest.TestCase):
+
+    def test_overriding_extension_index(self):
+        index = get_group_index(CORE_COMMANDS)
+        add_to_group_index(index, EXTENSION_COMMANDS)
+        self.assertEqual(['fake group create', 'fake group delete'], get_details(index, 'fake group'))
+        self.assertEqual(['fake extra', 'fake group'], get_details(index, 'fake'))
+
+        # The overridden command is restored from its core module.
+        remove_from_group_index(index, ['fake extra show'])
+        self.assertEqual(['fake group create', 'fake group delete'], get_details(index, 'fake group'))
+        self.assertEqual(['fake group'], get_details(index, 'fake'))
+        self.assertNotIn('fake extra', index)
+
+    def test_overriding_extension_snippets(self):
+        snippets = get_snippets(CORE_COMMANDS)
+        add_snippets(snippets, EXTENSION_COMMANDS)
+        self.assertEqual(['fake extra show', 'fake group create', 'fake group delete'], sorted(snippet['subcommand'] for snippet in snippets))
+        remove_snippets(snippets, ['fake extra show'])
+        self.assertEqual(CORE_COMMANDS, sorted(snippet['subcommand'] for snippet in snippets))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+# pylint: skip-file
+import unittest
+
+from azservice.memory import MemoryBudget, BudgetedCache, estimate_size
+
+
+class MemoryTest(unittest.TestCase):
+
+    def test_least_recently_used_evicted_across_caches(self):
+        budget = MemoryBudget(300)
+        evicted = []
+        help = BudgetedCache('help', budget, lambda value: 100, lambda key, value: evicted.append(key))
+        arguments = BudgetedCache('arguments', budget, lambda value: 100)
+        help['a'] = 1
+        arguments['b'] = 2
+        help['c'] = 3
+        help.get('a')
+        arguments['d'] = 4
+        self.assertEqual(300, budget.size)
+        self.assertNotIn('b', arguments)
+        self.assertIn('a', help)
+        arguments['e'] = 5
+        self.assertEqual(['c'], evicted)
+        self.assertEqual(1, help.evictions)
+        self.assertEqual(1, arguments.evictions)
+
+    def test_fixed_size_accounted(self):
+        budget = MemoryBudget(250)
+        cache = BudgetedCache('help', budget, lambda value: 100)
+        cache['a'] = 1
+        cache['b'] = 2
+        budget.set_fixed('group_index', 100)
+        self.assertNotIn('a', cache)
+        self.assertEqual(200, budget.size)
+        self.assertEqual({'size': 100}, budget.get_stats()['caches']['group_index'])
+
+    def test_unbounded(self):
+        budget = MemoryBudget()
+        cache = BudgetedCache('help', budget)
+        for i in range(100):
+            cache[i] = {'short-summary': 'Summary {}'.format(i)}
+        self.assertEqual(100, len(cache))
+        self.assertEqual(cache.size, budget.size)
+        cache.pop(0)
+        self.assertEqual(99, len(cache))
+        self.assertEqual(cache.size, budget.size)
+
+    def test_changes_counted(self):
+        budget = MemoryBudget(250)
+        cache = BudgetedCache('help', budget, lambda value: 100)
+        cache['a'] = 1
+        cache['b'] = 2
+        cache.get('a')
+        self.assertEqual(2, cache.changes)
+        cache['c'] = 3 # Evicts 'b'.
+        cache.pop('missing')
+        self.assertEqual(4, cache.get_stats()['changes'])
+
+    def test_estimate_size(self):
+        self.assertGreater(estimate_size({'a': ['x' * 1000]}), 1000)
+        self.assertEqual(0, estimate_size(estimate_size))
+
+
+if __name__ == '__main__':
+    unittest.main()
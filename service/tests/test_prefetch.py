@@ -0,0 +1,98 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+# pylint: skip-file
+import time
+import unittest
+from threading import Event
+
+from azservice.memory import MemoryBudget
+from azservice.prefetch import Prefetcher
+
+
+def started(value, event):
+    def job():
+        event.set()
+        return value
+    return job
+
+
+class PrefetchTest(unittest.TestCase):
+
+    def test_result_cached(self):
+        prefetcher = Prefetcher(interval=0)
+        prefetcher.start()
+        running = Event()
+        prefetcher.schedule([('a', 'kind', started(['x'], running))])
+        self.assertTrue(running.wait(5))
+        self.assertEqual((True, ['x']), prefetcher.get('a', 5))
+        self.assertEqual((False, None), prefetcher.get('b', 5))
+
+    def test_excluded_and_slow_kinds(self):
+        prefetcher = Prefetcher(interval=0, max_seconds=0.05, excluded=['never'])
+        prefetcher.start()
+        prefetcher.schedule([('a', 'never', lambda: ['x'])])
+        self.assertEqual((False, None), prefetcher.get('a', 1))
+        running = Event()
+        prefetcher.schedule([('b', 'slow', lambda: running.set() or time.sleep(0.1) or ['y'])])
+        self.assertTrue(running.wait(5))
+        self.assertEqual((True, ['y']), prefetcher.get('b', 5))
+        self.assertIn('slow', prefetcher.get_stats()['excluded'])
+
+    def test_waits_while_busy(self):
+        prefetcher = Prefetcher(interval=0)
+        prefetcher.set_idle(False)
+        prefetcher.start()
+        ran = Event()
+        prefetcher.schedule([('a', 'kind', started(['x'], ran))])
+        self.assertFalse(ran.wait(0.2))
+        prefetcher.set_idle(True)
+        self.assertTrue(ran.wait(5))
+
+    def test_waits_for_running(self):
+        prefetcher = Prefetcher(interval=0)
+        prefetcher.start()
+        running = Event()
+        release = Event()
+        prefetcher.schedule([('a', 'kind', lambda: running.set() or release.wait(5) and ['x'])])
+        self.assertTrue(running.wait(5))
+        self.assertEqual((False, None), prefetcher.get('a', 0.1))
+        release.set()
+        self.assertEqual((True, ['x']), prefetcher.get('a', 5))
+
+    def test_bounded(self):
+        prefetcher = Prefetcher(interval=0, max_entries=2)
+        prefetcher.start()
+        for key in ['a', 'b', 'c']:
+            running = Event()
+            prefetcher.schedule([(key, 'kind', started([key], running))])
+            self.assertTrue(running.wait(5))
+            self.assertTrue(prefetcher.get(key, 5)[0])
+        self.assertEqual(2, prefetcher.get_stats()['entries'])
+        self.assertFalse(prefetcher.get('a')[0])
+
+    def test_budgeted(self):
+        budget = MemoryBudget()
+        prefetcher = Prefetcher(budget=budget)
+        prefetcher.add_entries([('a', time.time(), ['x' * 1000]), ('b', time.time(), ['y' * 1000])])
+        stats = budget.get_stats()['caches']['prefetch']
+        self.assertEqual(2, stats['entries'])
+        self.assertGreater(stats['size'], 2000)
+        self.assertEqual(stats['size'], budget.size)
+        prefetcher.get('a')
+        budget.set_limit(1500) # Evicts the least recently used.
+        self.assertEqual((False, None), prefetcher.get('b'))
+        self.assertEqual((True, ['x' * 1000]), prefetcher.get('a'))
+        self.assertEqual(1, budget.get_stats()['caches']['prefetch']['evictions'])
+
+    def test_entries_handed_over(self):
+        prefetcher = Prefetcher(ttl=10)
+        prefetcher.add_entries([('a', time.time(), ['x']), ('b', time.time() - 20, ['y'])])
+        self.assertEqual(['a'], [ key for key, _, _ in prefetcher.get_entries() ])
+        self.assertEqual((True, ['x']), prefetcher.get('a'))
+
+
+if __name__ == '__main__':
+    unittest.main()
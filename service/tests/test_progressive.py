@@ -0,0 +1,66 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+# pylint: skip-file
+import unittest
+
+from azservice.progressive import is_progressive, take_ready_snippets, get_streams, send_chunks
+
+SNIPPETS = [ { 'subcommand': name } for name in ['group create', 'vm create', 'webapp create'] ]
+
+
+class ProgressiveTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loaded = set(['group create'])
+        self.written = []
+
+    def get_chunk(self, sent):
+        return [ snippet['subcommand'] for snippet in take_ready_snippets(SNIPPETS, self.loaded.__contains__, sent) ]
+
+    def write(self, sequence, chunk, more):
+        self.written.append((sequence, chunk, more))
+
+    def test_is_progressive(self):
+        self.assertTrue(is_progressive({ 'progressive': True }))
+        self.assertFalse(is_progressive({}))
+        self.assertFalse(is_progressive({ 'progressive': True, 'subcommand': 'group' }))
+
+    def test_ready_snippets(self):
+        self.assertEqual(['group create'], self.get_chunk(None))
+        self.loaded.add('vm create')
+        self.assertEqual(['group create', 'vm create'], self.get_chunk(None))
+
+    def test_chunks_without_duplicates(self):
+        sent = set()
+        self.assertEqual(['group create'], self.get_chunk(sent))
+        streams = get_streams([1], sent)
+        send_chunks(streams, self.get_chunk, self.write, True)
+        self.assertEqual([], self.written) # Nothing new, nothing sent.
+        self.loaded.add('vm create')
+        send_chunks(streams, self.get_chunk, self.write, True)
+        self.loaded.add('webapp create')
+        send_chunks(streams, self.get_chunk, self.write, False)
+        self.assertEqual([(1, ['vm create'], True), (1, ['webapp create'], False)], self.written)
+
+    def test_final_chunk_sent_empty(self):
+        sent = set()
+        self.get_chunk(sent)
+        send_chunks(get_streams([1], sent), self.get_chunk, self.write, False)
+        self.assertEqual([(1, [], False)], self.written)
+
+    def test_stream_per_coalesced_sequence(self):
+        sent = set()
+        self.get_chunk(sent)
+        streams = get_streams([1, 2], sent)
+        self.loaded.add('vm create')
+        send_chunks(streams, self.get_chunk, self.write, True)
+        send_chunks(streams, self.get_chunk, self.write, False)
+        self.assertEqual([(1, ['vm create'], True), (2, ['vm create'], True), (1, [], False), (2, [], False)], self.written)
+        self.assertEqual(set(['group create']), sent)
+
+
+if __name__ == '__main__':
+    unittest.main()
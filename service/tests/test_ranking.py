@@ -0,0 +1,45 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+# pylint: skip-file
+import unittest
+
+from azservice.ranking import get_value_completions, rank_values
+
+
+class RankingTest(unittest.TestCase):
+
+    def test_ranks(self):
+        values = ['my-app', 'MyGroup', 'myGroup2', 'other-my', 'unrelated', 'mygroup']
+        self.assertEqual(rank_values(values, 'my'), [
+            (0, 'my-app'), (0, 'mygroup'), (0, 'myGroup2'),
+            (1, 'MyGroup'),
+            (2, 'other-my'),
+        ])
+
+    def test_order_ignores_case(self):
+        self.assertEqual([ item for _, item in rank_values(['b', 'C', 'a', 'B'], '') ], ['a', 'b', 'B', 'C'])
+
+    def test_duplicates_and_non_strings(self):
+        self.assertEqual(rank_values(['1', 1, 2, 'x', 'x'], ''), [(0, '1'), (0, '2'), (0, 'x')])
+
+    def test_limit(self):
+        values = [ 'rg-{:03d}'.format(i) for i in range(100, 0, -1) ]
+        self.assertEqual([ item for _, item in rank_values(values, 'rg', 3) ], ['rg-001', 'rg-002', 'rg-003'])
+        self.assertEqual(len(rank_values(values, 'rg', 0)), 100)
+        self.assertEqual(len(rank_values(values, 'rg', None)), 100)
+
+    def test_sort_text(self):
+        values = [ 'Item{}'.format(i) for i in range(12) ] + ['item']
+        completions = get_value_completions(values, 'item')
+        self.assertEqual([ c['sortText'] for c in completions ], [ '{:02d}'.format(i) for i in range(13) ])
+        self.assertEqual(completions[0]['name'], 'item')
+        # The editor sorts by sortText as strings, that order is the service's.
+        self.assertEqual([ c['name'] for c in sorted(completions, key=lambda c: c['sortText']) ], [ c['name'] for c in completions ])
+        self.assertEqual(get_value_completions(['a b'], '')[0]['snippet'], '"a b"')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+# pylint: skip-file
+import json
+import sys
+import time
+import unittest
+from threading import Condition
+
+from azservice.supervisor import Supervisor
+
+WORKER = '''
+import json, os, sys
+for line in iter(sys.stdin.readline, ''):
+    request = json.loads(line)
+    data = request['data']
+    if data.get('chunks'):
+        for _ in range(data['chunks']):
+            print(json.dumps({ 'sequence': request['sequence'], 'data': ['chunk'], 'more': True }), flush=True)
+    if data.get('crash'):
+        sys.exit(1)
+    print(json.dumps({ 'sequence': request['sequence'], 'data': { 'pid': os.getpid() } }), flush=True)
+'''
+
+
+class Output(object):
+
+    def __init__(self):
+        self.responses = []
+        self.condition = Condition()
+
+    def write(self, line):
+        with self.condition:
+            self.responses.append(json.loads(line))
+            self.condition.notify_all()
+
+    def wait_for(self, sequence, timeout=10):
+        deadline = time.time() + timeout
+        with self.condition:
+            while True:
+                final = [ response for response in self.responses if response['sequence'] == sequence and not response.get('more') ]
+                if final or time.time() > deadline:
+                    return [ response for response in self.responses if response['sequence'] == sequence ]
+                self.condition.wait(0.1)
+
+
+class SupervisorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.output = Output()
+        self.supervisor = Supervisor([sys.executable, '-c', WORKER], self.output.write)
+        self.supervisor.start()
+
+    def tearDown(self):
+        self.supervisor.close()
+
+    def send(self, sequence, data):
+        self.supervisor.send(json.dumps({ 'sequence': sequence, 'data': data }))
+        return self.output.wait_for(sequence)
+
+    def test_standby_takes_over(self):
+        first = self.send(1, { 'request': 'status' })[-1]['data']['pid']
+        self.assertIsNotNone(self.supervisor.standby)
+        standby = self.supervisor.standby.process.pid
+        # Retried once on the standby, then answered empty.
+        self.assertEqual([{ 'sequence': 2, 'data': [] }], self.send(2, { 'crash': True }))
+        third = self.send(3, { 'request': 'status' })[-1]['data']['pid']
+        self.assertNotIn(third, [first, standby])
+
+    def test_partial_stream_ended(self):
+        self.send(1, { 'request': 'status' })
+        responses = self.send(2, { 'chunks': 2, 'crash': True })
+        self.assertEqual([True, True, None], [ response.get('more') for response in responses ])
+        self.assertEqual([], responses[-1]['data'])
+        self.assertIn('pid', self.send(3, { 'request': 'status' })[-1]['data'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,6 +4,9 @@
 # --------------------------------------------------------------------------------------------
 
 # pylint: skip-file
+import os
+import shutil
+import tempfile
 import unittest
 import collections
 try:
@@ -11,7 +14,7 @@ try:
 except AttributeError:
     collectionsAbc = collections
 
-from azservice.tooling import GLOBAL_ARGUMENTS, initialize, load_command_table, get_help, get_current_subscription, get_configured_defaults, get_defaults, is_required, run_argument_value_completer, get_arguments
+from azservice.tooling import GLOBAL_ARGUMENTS, initialize, load_command_table, get_help, get_current_subscription, get_configured_defaults, get_defaults, is_required, run_argument_value_completer, get_arguments, get_installed_extensions, load_extension, unload_extension, get_config_mtime
 
 TEST_GROUP = 'webapp'
 TEST_COMMAND = 'webapp create'
@@ -26,6 +29,39 @@ TEST_COMMAND_WITH_CHOICES = 'appservice plan create'
 TEST_ARGUMENT_WITH_CHOICES = 'sku'
 TEST_COMMAND_WITH_COMPLETER = 'account set'
 TEST_ARGUMENT_WITH_COMPLETER = 'subscription'
+TEST_OVERRIDDEN_COMMAND = 'group create'
+
+FAKE_EXTENSION = '''
+from azure.cli.core import AzCommandsLoader
+from azure.cli.core.commands import CliCommandType
+
+
+def create_group(name):
+    pass
+
+
+def hello():
+    pass
+
+
+class FakeCommandsLoader(AzCommandsLoader):
+
+    def __init__(self, cli_ctx=None):
+        super(FakeCommandsLoader, self).__init__(cli_ctx=cli_ctx, custom_command_type=CliCommandType(operations_tmpl='azext_fakeext#{}'))
+
+    def load_command_table(self, args):
+        with self.command_group('group') as g:
+            g.custom_command('create', 'create_group')
+        with self.command_group('fakeext') as g:
+            g.custom_command('hello', 'hello')
+        return self.command_table
+
+    def load_arguments(self, command):
+        pass
+
+
+COMMAND_LOADER_CLS = FakeCommandsLoader
+'''
 
 
 class ToolingTest(unittest.TestCase):
@@ -97,6 +133,15 @@ class ToolingTest(unittest.TestCase):
         self.assertTrue(defaults.get(TEST_ARGUMENT_WITH_DEFAULT))
         self.assertFalse(defaults.get(TEST_ARGUMENT_WITHOUT_DEFAULT))
 
+    def test_argument_defaults_from_snapshot(self):
+        command = self.command_table.get(TEST_COMMAND)
+        self.assertIsNotNone(command)
+        arguments = get_arguments(command)
+        self.assertEqual(get_defaults(arguments), get_defaults(arguments, get_configured_defaults()))
+        defaults = get_defaults(arguments, { 'group': 'configured-group' })
+        self.assertEqual('configured-group', defaults.get('resource_group_name'))
+        self.assertTrue(defaults.get(TEST_ARGUMENT_WITH_DEFAULT))
+
     def test_argument_choices(self):
         command = self.command_table.get(TEST_COMMAND_WITH_CHOICES)
         self.assertIsNotNone(command)
@@ -116,6 +161,19 @@ class ToolingTest(unittest.TestCase):
         values = run_argument_value_completer(command, argument, {})
         self.assertTrue(isinstance(values, collectionsAbc.Sequence))
 
+    def test_argument_completer_prefix(self):
+        command = self.command_table.get(TEST_COMMAND_WITH_COMPLETER)
+        argument = get_arguments(command)[TEST_ARGUMENT_WITH_COMPLETER]
+        completer = argument.completer
+        try:
+            argument.completer = lambda prefix, action, parsed_args: [prefix]
+            self.assertEqual(['sub'], run_argument_value_completer(command, argument, {}, 'sub'))
+            # Completers without a prefix parameter still run.
+            argument.completer = lambda: ['all']
+            self.assertEqual(['all'], run_argument_value_completer(command, argument, {}, 'sub'))
+        finally:
+            argument.completer = completer
+
     def test_current_subscription(self):
         subscription = get_current_subscription()
         self.assertTrue(subscription is None or isinstance(subscription, str))
@@ -124,6 +182,51 @@ class ToolingTest(unittest.TestCase):
         defaults = get_configured_defaults()
         self.assertTrue(isinstance(defaults, dict))
 
+    def test_config_mtime(self):
+        mtime = get_config_mtime()
+        self.assertTrue(mtime is None or mtime > 0)
+
+    def test_installed_extensions(self):
+        extensions = get_installed_extensions()
+        self.assertTrue(isinstance(extensions, dict))
+
+    def test_extension_overriding_core_command(self):
+        from azure.cli.core import extension
+        extensions_dir = tempfile.mkdtemp()
+        module_dir = os.path.join(extensions_dir, 'fakeext', 'azext_fakeext')
+        os.makedirs(module_dir)
+        with open(os.path.join(module_dir, '__init__.py'), 'w') as f:
+            f.write(FAKE_EXTENSION)
+        previous_dir = extension.EXTENSIONS_DIR
+        extension.EXTENSIONS_DIR = extensions_dir
+        try:
+            self.assertEqual(['fakeext'], list(get_installed_extensions()))
+            core_command = self.command_table[TEST_OVERRIDDEN_COMMAND]
+            command_names = load_extension(self.command_table, 'fakeext')
+            self.assertEqual(['fakeext hello', TEST_OVERRIDDEN_COMMAND], sorted(command_names))
+            self.assertIsNot(core_command, self.command_table[TEST_OVERRIDDEN_COMMAND])
+            self.assertEqual(sorted(command_names), sorted(unload_extension(self.command_table, 'fakeext')))
+        finally:
+            extension.EXTENSIONS_DIR = previous_dir
+            shutil.rmtree(extensions_dir)
+        self.assertNotIn('fakeext hello', self.command_table)
+        restored = self.command_table[TEST_OVERRIDDEN_COMMAND]
+        self.assertEqual('resource', restored.command_source)
+        self.assertIn('rg_name', get_arguments(restored))
+
+    def test_lazy_module_failing_to_load(self):
+        from azservice.tooling2 import LazyCommandTable
+        table = LazyCommandTable({}, { 'azext_not_installed': { 'commands': ['missing show', 'missing list'] } })
+        self.assertIn('missing show', table)
+        self.assertIsNone(table.get('missing show'))
+        self.assertNotIn('missing show', table)
+        self.assertNotIn('missing list', table)
+        self.assertRaises(KeyError, lambda: table['missing list'])
+
+    def test_unload_unknown_extension(self):
+        self.assertEqual([], unload_extension(self.command_table, 'not-installed'))
+        self.assertIsNotNone(self.command_table.get(TEST_COMMAND))
+
 
 if __name__ == '__main__':
     unittest.main()
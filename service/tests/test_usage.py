@@ -0,0 +1,58 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+# pylint: skip-file
+import unittest
+
+from azservice.usage import UsageIndex, get_example_options
+
+COMMAND_TABLE = { 'vm create': None, 'group create': None }
+
+
+class UsageTest(unittest.TestCase):
+
+    def test_example_options(self):
+        examples = [
+            'az vm create -n MyVm -g MyResourceGroup --image Ubuntu2204',
+            'az group create -n MyResourceGroup -l westus\naz vm create -n MyVm -g MyResourceGroup \\\n  --image Debian11 --admin-username=azureuser',
+        ]
+        self.assertEqual(list(get_example_options('vm create', examples, COMMAND_TABLE)), [
+            set(['-n', '-g', '--image']),
+            set(['-n', '-g', '--image', '--admin-username']),
+        ])
+
+    def test_scores(self):
+        index = UsageIndex()
+        index.add('vm create', [set(['-n', '--image']), set(['-n', '--size']), set(['--image', '--size', '--zone']), set()])
+        self.assertEqual(index.get_scores('vm create', []), { '-n': 2, '--image': 2, '--size': 2, '--zone': 1 })
+        # Examples using --image count twice.
+        self.assertEqual(index.get_scores('vm create', ['--image']), { '-n': 3, '--size': 3, '--zone': 2 })
+        self.assertEqual(index.get_scores('group create', ['-n']), {})
+        self.assertEqual(index.get_stats()['examples'], 3)
+        index.remove(['vm create'])
+        self.assertEqual(index.get_scores('vm create', []), {})
+
+    def test_pending(self):
+        index = UsageIndex()
+        index.schedule(['a', 'b', 'c'])
+        self.assertEqual(len(index.take_pending(2)), 2)
+        self.assertTrue(index.has_pending())
+        index.take_pending(2)
+        self.assertFalse(index.has_pending())
+
+    def test_schedule_new(self):
+        index = UsageIndex()
+        index.schedule(['a', 'b'])
+        index.take_pending(2)
+        index.schedule_new(['a', 'b', 'c'])
+        self.assertEqual(index.take_pending(3), ['c'])
+        # Removed commands are scheduled again when added back.
+        index.remove(['a'])
+        index.schedule_new(['a', 'b', 'c'])
+        self.assertEqual(index.take_pending(3), ['a'])
+
+
+if __name__ == '__main__':
+    unittest.main()
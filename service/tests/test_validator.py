@@ -0,0 +1,103 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+# pylint: skip-file
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+from azservice import validator
+from azservice.azcli import get_invocations
+
+TEST_COMMANDS = ['group create', 'group show', 'appservice plan create']
+VALID_SCRIPT = 'az group create -n MyResourceGroup -l westus\naz group show -n MyResourceGroup -o table\n'
+INVALID_SCRIPT = 'az group frobnicate -n MyResourceGroup\naz group create -n MyResourceGroup -l westus --frobnicate\n'
+
+
+class ValidatorTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # A small command table, main() loads the full one.
+        validator.load([])
+        validator.COMMAND_TABLE = { name: validator.COMMAND_TABLE[name] for name in TEST_COMMANDS }
+        validator.GROUPS.clear()
+        validator.GROUPS.update(['group', 'appservice', 'appservice plan'])
+
+    def validate(self, text):
+        return [ diagnostic for invocation in get_invocations(text) for diagnostic in validator.validate_invocation(invocation) ]
+
+    def test_valid(self):
+        self.assertEqual([], self.validate(VALID_SCRIPT))
+        self.assertEqual([], self.validate('az group -h'))
+
+    def test_unknown_command(self):
+        self.assertEqual([ (d['line'], d['command'], d['code']) for d in self.validate(INVALID_SCRIPT.split('\n')[0]) ], [
+            (1, 'az group frobnicate', 'unknown-command'),
+        ])
+        self.assertEqual(['unknown-command'], [ d['code'] for d in self.validate('az group') ])
+
+    def test_unknown_argument(self):
+        diagnostics = self.validate('\n' + INVALID_SCRIPT.split('\n')[1])
+        self.assertEqual([ (d['line'], d['command'], d['code']) for d in diagnostics ], [
+            (2, 'az group create', 'unknown-argument'),
+        ])
+        self.assertIn('--frobnicate', diagnostics[0]['message'])
+
+    def test_invalid_choice(self):
+        diagnostics = self.validate('az appservice plan create -g MyResourceGroup -n MyPlan --sku P9X')
+        self.assertEqual(['invalid-choice'], [ d['code'] for d in diagnostics ])
+        self.assertIn("'P9X' for --sku", diagnostics[0]['message'])
+        # Case-insensitive, variables are not checked.
+        self.assertEqual([], self.validate('az appservice plan create -g MyResourceGroup -n MyPlan --sku s1'))
+        self.assertEqual([], self.validate('az appservice plan create -g MyResourceGroup -n MyPlan --sku $sku'))
+
+    def test_missing_argument(self):
+        diagnostics = self.validate('az group create -n MyResourceGroup')
+        self.assertEqual(['missing-argument'], [ d['code'] for d in diagnostics ])
+        self.assertIn('--location', diagnostics[0]['message'])
+
+
+class ValidatorMainTest(unittest.TestCase):
+
+    def test_exit_code(self):
+        directory = tempfile.mkdtemp()
+        try:
+            with io.open(os.path.join(directory, 'valid.azcli'), 'w') as f:
+                f.write(VALID_SCRIPT)
+            self.assertEqual((0, 0, 0), self.run_main([os.path.join(directory, 'valid.azcli')]))
+            with io.open(os.path.join(directory, 'invalid.azcli'), 'w') as f:
+                f.write(INVALID_SCRIPT)
+            self.assertEqual((1, 2, 1), self.run_main([directory, os.path.join(directory, 'missing.azcli')]))
+            # Validated in forked worker processes.
+            with io.open(os.path.join(directory, 'choice.azcli'), 'w') as f:
+                f.write('az appservice plan create -g MyResourceGroup -n MyPlan --sku P9X\n')
+            context = multiprocessing.get_context('fork')
+            with mock.patch.object(context, 'Pool', wraps=context.Pool) as pool:
+                self.assertEqual((1, 3, 0), self.run_main([directory], 2))
+            pool.assert_called_once_with(2)
+        finally:
+            shutil.rmtree(directory)
+
+    def run_main(self, paths, jobs=1):
+        """Returns the exit code, the number of diagnostics and the number of files not read."""
+        output = io.StringIO()
+        with redirect_stdout(output):
+            code = validator.main(paths + ['--jobs', str(jobs)])
+        results = [ json.loads(line) for line in output.getvalue().splitlines() ]
+        summary = results.pop()['summary']
+        self.assertEqual(summary['diagnostics'], sum(len(result.get('diagnostics', [])) for result in results))
+        self.assertEqual(summary['errors'], len([ result for result in results if 'error' in result ]))
+        return code, summary['diagnostics'], summary['errors']
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -26,7 +26,20 @@ export type Arguments = Record<string, string | null>;
 export interface CompletionQuery {
     subcommand?: string;
     argument?: string;
-    arguments?: Arguments
+    arguments?: Arguments;
+    progressive?: boolean;
+    prefix?: string;
+    limit?: number;
+}
+
+export interface CompletionResult {
+    completions: Completion[];
+    incomplete: boolean;
+}
+
+interface ProgressiveCompletions {
+    completions: Completion[];
+    more: boolean;
 }
 
 export interface Status {
@@ -54,6 +67,7 @@ interface HoverQuery {
 interface Message<T> {
     sequence: number;
     data: T;
+    more?: boolean;
 }
 
 export class AzService {
@@ -62,8 +76,9 @@ export class AzService {
     private data = '';
     private listeners: { [sequence: number]: ((err: undefined | any, response: Message<any> | undefined) => void); } = {};
     private nextSequenceNumber = 1;
+    private progressiveCompletions: ProgressiveCompletions | undefined;
 
-    constructor(azNotFound: (wrongVersion: boolean) => void) {
+    constructor(azNotFound: (wrongVersion: boolean) => void, private supervise = false) {
         this.getProcess()
             .catch(err => {
                 console.log(err);
@@ -71,12 +86,32 @@ export class AzService {
             });
     }
 
-    async getCompletions(query: CompletionQuery, onCancel: (handle: () => void) => void): Promise<Completion[]> {
+    async getCompletions(query: CompletionQuery, onCancel: (handle: () => void) => void): Promise<CompletionResult> {
         try {
-            return this.send<CompletionQuery, Completion[]>(query, onCancel);
+            if (query.subcommand !== undefined) {
+                const completions = await this.send<CompletionQuery, Completion[]>(query, onCancel);
+                return { completions, incomplete: query.limit !== undefined && completions.length >= query.limit };
+            }
+            // Root completions arrive in chunks while the service is still loading, answer repeated queries from what arrived so far.
+            let stream = this.progressiveCompletions;
+            if (!stream) {
+                const current: ProgressiveCompletions = { completions: [], more: true };
+                this.progressiveCompletions = stream = current;
+                await this.send<CompletionQuery, Completion[]>({ ...query, progressive: true }, onCancel, (chunk, more) => {
+                    current.completions = current.completions.concat(chunk);
+                    current.more = more;
+                    if (!more && this.progressiveCompletions === current) {
+                        this.progressiveCompletions = undefined;
+                    }
+                });
+            }
+            return { completions: stream.completions, incomplete: stream.more };
         } catch (err) {
+            if (err !== 'canceled') {
+                this.progressiveCompletions = undefined;
+            }
             console.error(err);
-            return [];
+            return { completions: [], incomplete: false };
         }
     }
 
@@ -91,7 +126,7 @@ export class AzService {
         }, onCancel);
     }
 
-    private async send<T, R>(data: T, onCancel?: (handle: () => void) => void): Promise<R> {
+    private async send<T, R>(data: T, onCancel?: (handle: () => void) => void, onChunk?: (data: R, more: boolean) => void): Promise<R> {
         const process = await this.getProcess();
         return new Promise<R>((resolve, reject) => {
             if (onCancel) {
@@ -103,6 +138,9 @@ export class AzService {
                     reject(err);
                 } else {
                     try {
+                        if (onChunk) {
+                            onChunk(response!.data, !!response!.more);
+                        }
                         resolve(response!.data);
                     } catch (err) {
                         reject(err);
@@ -169,18 +207,20 @@ export class AzService {
     }
 
     private spawn(pythonLocation: string, processOptions?: SpawnOptions) {
-        const process = spawn(join(__dirname, `../../service/az-service${isWindows ? '.bat' : ''}`), [pythonLocation], processOptions);
+        const process = spawn(join(__dirname, `../../service/az-service${isWindows ? '.bat' : ''}`), [pythonLocation, ...(this.supervise ? ['--supervise'] : [])], processOptions);
         process.stdout.setEncoding('utf8');
         process.stdout.on('data', data => {
             this.data += data;
-            const nl = this.data.indexOf('\n');
-            if (nl !== -1) {
+            let nl: number;
+            while ((nl = this.data.indexOf('\n')) !== -1) {
                 const line = this.data.substr(0, nl);
                 this.data = this.data.substr(nl + 1);
-                const response = JSON.parse(line);
+                const response: Message<any> = JSON.parse(line);
                 const listener = this.listeners[response.sequence];
                 if (listener) {
-                    delete this.listeners[response.sequence];
+                    if (!response.more) {
+                        delete this.listeners[response.sequence];
+                    }
                     listener(undefined, response);
                 }
             }
@@ -195,6 +235,7 @@ export class AzService {
         process.on('exit', (code, signal) => {
             console.error(`Exit code ${code}, signal ${signal}`);
             this.process = undefined;
+            this.progressiveCompletions = undefined;
             for (const sequence in this.listeners) {
                 const listener = this.listeners[sequence];
                 delete this.listeners[sequence];
@@ -6,13 +6,13 @@ import * as jmespath from 'jmespath';
 import { HoverProvider, Hover, SnippetString, StatusBarAlignment, StatusBarItem, ExtensionContext, TextDocument, TextDocumentChangeEvent, Disposable, TextEditor, Selection, languages, commands, Range, ViewColumn, Position, CancellationToken, ProviderResult, CompletionItem, CompletionList, CompletionItemKind, CompletionItemProvider, window, workspace, env, Uri, WorkspaceEdit, l10n,  } from 'vscode';
 import * as process from "process";
 
-import { AzService, CompletionKind, Arguments, Status } from './azService';
+import { AzService, CompletionKind, CompletionQuery, Arguments, Status } from './azService';
 import { parse, findNode } from './parser';
 import { exec } from './utils';
 import * as spinner from 'elegant-spinner';
 
 export function activate(context: ExtensionContext) {
-    const azService = new AzService(azNotFound);
+    const azService = new AzService(azNotFound, workspace.getConfiguration('azureCLI', null).get<boolean>('keepStandbyService', false));
     context.subscriptions.push(languages.registerCompletionItemProvider('azcli', new AzCompletionItemProvider(azService), ' '));
     context.subscriptions.push(languages.registerHoverProvider('azcli', new AzHoverProvider(azService)));
     const status = new StatusBarInfo(azService);
@@ -22,6 +22,8 @@ export function activate(context: ExtensionContext) {
     context.subscriptions.push(commands.registerCommand('ms-azurecli.installAzureCLI', installAzureCLI));
 }
 
+const valueCompletionLimit = 200;
+
 const completionKinds: Record<CompletionKind, CompletionItemKind> = {
     group: CompletionItemKind.Module,
     command: CompletionItemKind.Function,
@@ -58,8 +60,14 @@ class AzCompletionItemProvider implements CompletionItemProvider {
         const argument = (/\s(--?[^\s]+)\s+[^-\s]*$/.exec(upToCursor) || [])[1];
         const prefix = (/(^|\s)([^\s]*)$/.exec(upToCursor) || [])[2];
         const lead = /^-*/.exec(prefix)![0];
-        return this.azService.getCompletions(subcommand[0] === 'az' ? { subcommand: subcommand.slice(1).join(' '), argument, arguments: args } : {}, token.onCancellationRequested)
-            .then(completions => completions.map(({ name, kind, detail, documentation, snippet, sortText }) => {
+        const query: CompletionQuery = subcommand[0] === 'az' ? { subcommand: subcommand.slice(1).join(' '), argument, arguments: args } : {};
+        if (query.argument) {
+            // The service filters and caps values, the list is requested again as the prefix gets longer.
+            query.prefix = prefix;
+            query.limit = valueCompletionLimit;
+        }
+        return this.azService.getCompletions(query, token.onCancellationRequested)
+            .then(({ completions, incomplete }) => new CompletionList(completions.map(({ name, kind, detail, documentation, snippet, sortText }) => {
                 const item = new CompletionItem(name, completionKinds[kind]);
                 if (snippet) {
                     item.insertText = new SnippetString(snippet);
@@ -76,7 +84,7 @@ class AzCompletionItemProvider implements CompletionItemProvider {
                     item.sortText = sortText;
                 }
                 return item;
-            }));
+            }), incomplete));
     }
 
     private getArguments(line: string) {